@@ -13,7 +13,7 @@ sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), ".."
 from app.core.database import Base
 from app.core.config import get_settings
 # Import all models to ensure they are registered
-from app.models.database import Question, DuplicateMatch, BatchPlan, BatchQuestion
+from app.models.database import Question, QuestionEmbedding, DuplicateMatch, PairVerdict, BatchPlan, BatchQuestion
 from app.models.subject_topic import Subject, Topic, CourseOutcome
 
 settings = get_settings()
@@ -0,0 +1,48 @@
+"""Batch job state
+
+Revision ID: 5a1e3b7c9d02
+Revises: c83f9e75d812
+Create Date: 2026-10-18 10:05:12.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a1e3b7c9d02'
+down_revision: Union[str, Sequence[str], None] = 'c83f9e75d812'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('batch_plans', sa.Column('subject', sa.String(length=255), nullable=True))
+
+    with op.batch_alter_table('batch_questions') as batch_op:
+        batch_op.alter_column('question_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.add_column(sa.Column('topic', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('bloom_level', sa.String(length=4), nullable=True))
+        batch_op.add_column(sa.Column('difficulty', sa.String(length=6), nullable=True))
+        batch_op.add_column(sa.Column('marks', sa.Integer(), nullable=True))
+        # Existing rows were generated synchronously, so they are complete
+        batch_op.add_column(sa.Column('status', sa.String(length=9), nullable=False, server_default='COMPLETED'))
+        batch_op.add_column(sa.Column('error', sa.Text(), nullable=True))
+        batch_op.create_index('ix_batch_questions_status', ['status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('batch_questions') as batch_op:
+        batch_op.drop_index('ix_batch_questions_status')
+        batch_op.drop_column('error')
+        batch_op.drop_column('status')
+        batch_op.drop_column('marks')
+        batch_op.drop_column('difficulty')
+        batch_op.drop_column('bloom_level')
+        batch_op.drop_column('topic')
+
+    op.drop_column('batch_plans', 'subject')
@@ -0,0 +1,28 @@
+"""Question status/created_at index
+
+Revision ID: 8b2d4f6a1c37
+Revises: 5a1e3b7c9d02
+Create Date: 2026-10-18 11:32:47.903126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d4f6a1c37'
+down_revision: Union[str, Sequence[str], None] = '5a1e3b7c9d02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_questions_status_created_at', 'questions', ['status', 'created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_questions_status_created_at', table_name='questions')
@@ -0,0 +1,32 @@
+"""Batch question claims
+
+Revision ID: d4c7a2e9f015
+Revises: 8b2d4f6a1c37
+Create Date: 2026-10-18 15:12:06.271544
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4c7a2e9f015'
+down_revision: Union[str, Sequence[str], None] = '8b2d4f6a1c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('batch_questions') as batch_op:
+        batch_op.add_column(sa.Column('claim_token', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('batch_questions') as batch_op:
+        batch_op.drop_column('claimed_at')
+        batch_op.drop_column('claim_token')
@@ -1,31 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.limiter import limiter
-from app.models.schemas import BatchPlanRequest, BatchPlanResponse
-from app.services.batch_service import BatchService
+from app.models.schemas import BatchPlanRequest, BatchPlanResponse, BatchPlanStatusResponse
+from app.services.batch_service import BatchService, run_batch_plan
 
 router = APIRouter(prefix="/api/v1/batch", tags=["Batch"])
 
 
-@router.post("/plan", response_model=BatchPlanResponse, status_code=201)
+@router.post("/plan", response_model=BatchPlanStatusResponse, status_code=202)
 @limiter.limit("1/minute")
 def create_batch_plan(
     request: Request,
     batch_request: BatchPlanRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
-    Create a batch plan and generate multiple questions
+    Create a batch plan and queue generation of its questions
     
-    Each question is generated independently using the canonical prompt.
+    Returns immediately with the plan id; questions are generated in the background.
+    Poll `/plan/{batch_id}/status` for progress.
     
     - **plan_name**: Name for this batch plan
     - **subject**: Subject for all questions
     - **questions**: List of question specifications (topic, bloom_level, difficulty, marks)
     """
     service = BatchService(db)
-    return service.create_batch_plan(batch_request)
+    status = service.create_batch_plan(batch_request)
+    background_tasks.add_task(run_batch_plan, status.id)
+    return status
+
+
+@router.get("/plan/{batch_id}/status", response_model=BatchPlanStatusResponse)
+def get_batch_plan_status(
+    batch_id: int,
+    db: Session = Depends(get_db)
+):
+    """Get pending/running/completed/failed counts for a batch plan"""
+    service = BatchService(db)
+    status = service.get_batch_status(batch_id)
+    
+    if not status:
+        raise HTTPException(status_code=404, detail="Batch plan not found")
+    
+    return status
+
+
+@router.post("/plan/{batch_id}/resume", response_model=BatchPlanStatusResponse, status_code=202)
+def resume_batch_plan(
+    batch_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """
+    Retry failed entries and finish any left unfinished (e.g. after a restart)
+    
+    Entries still being generated by a worker are not touched.
+    """
+    service = BatchService(db)
+    if not service.get_batch_status(batch_id):
+        raise HTTPException(status_code=404, detail="Batch plan not found")
+    
+    service.requeue_batch_plan(batch_id)
+    background_tasks.add_task(run_batch_plan, batch_id)
+    return service.get_batch_status(batch_id)
 
 
 @router.get("/plan/{batch_id}", response_model=BatchPlanResponse)
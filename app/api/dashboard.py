@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Response, WebSocket, WebSocketDisconnect
+from sqlalchemy.orm import Session, joinedload
 from app.core.database import get_db, SessionLocal
+from app.core.websocket import manager, publish_status_changes
 from app.models.database import Question, QuestionStatus, DuplicateMatch
 from app.models.schemas import (
     QuestionResponse, 
     QuestionMetadata, 
+    QuestionListResponse,
     DuplicateMatchResponse,
     LinkQuestionsRequest,
     RelationType
 )
+from app.services.vector_index import sync_index
+from app.services.pagination import paginate_questions
+from app.services.status_counts import status_counts
 from typing import List
 from pydantic import BaseModel
 
@@ -29,44 +34,88 @@ class UpdateStatusRequest(BaseModel):
 
 def run_bg_dedupe(question_ids: List[int]):
     """Background task to run deduplication logic"""
-    from app.services.logger_service import log
-    log.info(f"Background Process Started for {len(question_ids)} questions.")
-    db = SessionLocal()
+    from app.services.logger_service import log, correlation_id, correlation_scope, new_correlation_id
+    # The job gets its own id; the submitting request's id is logged once to link them
+    parent_id = correlation_id.get()
+    with correlation_scope(new_correlation_id("dedupe-")):
+        log.info(f"Background Process Started for {len(question_ids)} questions.", parent_id=parent_id)
+        manager.publish({"type": "dedupe_started", "total": len(question_ids)})
+        db = SessionLocal()
+        try:
+            from app.services.deduplicator import DeduplicationService
+            deduper = DeduplicationService(db)
+            questions = db.query(Question).filter(Question.id.in_(question_ids)).all()
+            # Waiting-room questions are part of the bank the others are compared against
+            sync_index(db, questions)
+
+            def on_progress(done: int, total: int, question: Question):
+                manager.publish({
+                    "type": "dedupe_progress",
+                    "done": done,
+                    "total": total,
+                    "question_id": question.id,
+                    "verdict": question.status.value
+                })
+
+            deduper.check_questions(questions, on_progress=on_progress)
+            status_counts.invalidate()
+            publish_status_changes(questions)
+            manager.publish({"type": "dedupe_finished", "total": len(questions)})
+            log.success(f"Background Deduplication completed for batch of {len(question_ids)}.")
+        except Exception as e:
+            log.error(f"Background dedupe failed: {e}")
+            manager.publish({"type": "dedupe_failed", "error": str(e)})
+        finally:
+            db.close()
+
+
+@router.websocket("/ws")
+async def dashboard_events(websocket: WebSocket):
+    """Stream dedupe progress, status changes and new questions to the dashboard"""
+    await manager.connect(websocket)
     try:
-        from app.services.deduplicator import DeduplicationService
-        deduper = DeduplicationService(db)
-        questions = db.query(Question).filter(Question.id.in_(question_ids)).all()
-        for question in questions:
-            deduper.check_question(question)
-        log.success(f"Background Deduplication completed for batch of {len(question_ids)}.")
-    except Exception as e:
-        log.error(f"Background dedupe failed: {e}")
+        while True:
+            # Clients only listen; receiving just notices when they go away
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
     finally:
-        db.close()
+        manager.disconnect(websocket)
 
 
 @router.get("/stats", response_model=StatusCountResponse)
-def get_status_counts(db: Session = Depends(get_db)):
-    """Get count of questions by status"""
-    dedupe_pending = db.query(Question).filter(Question.status == QuestionStatus.DEDUPE_PENDING).count()
-    dedupe_approved = db.query(Question).filter(Question.status == QuestionStatus.DEDUPE_APPROVED).count()
-    duplicate_flagged = db.query(Question).filter(Question.status == QuestionStatus.DUPLICATE_FLAGGED).count()
-    approved = db.query(Question).filter(Question.status == QuestionStatus.APPROVED).count()
+def get_status_counts(request: Request, response: Response, db: Session = Depends(get_db)):
+    """Get count of questions by status (answers 304 when the client's ETag is still current)"""
+    counts, etag = status_counts.get(db)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     
     return {
-        "dedupe_pending": dedupe_pending,
-        "dedupe_approved": dedupe_approved,
-        "duplicate_flagged": duplicate_flagged,
-        "approved": approved
+        "dedupe_pending": counts[QuestionStatus.DEDUPE_PENDING.value],
+        "dedupe_approved": counts[QuestionStatus.DEDUPE_APPROVED.value],
+        "duplicate_flagged": counts[QuestionStatus.DUPLICATE_FLAGGED.value],
+        "approved": counts[QuestionStatus.APPROVED.value]
     }
 
 
-@router.get("/questions/{status}", response_model=List[QuestionResponse])
-def get_questions_by_status(status: QuestionStatus, db: Session = Depends(get_db)):
-    """Get all questions with a specific status"""
-    questions = db.query(Question).filter(Question.status == status).order_by(Question.created_at.desc()).all()
+@router.get("/questions/{status}", response_model=QuestionListResponse)
+def get_questions_by_status(
+    status: QuestionStatus,
+    limit: int = 50,
+    cursor: str | None = None,
+    db: Session = Depends(get_db)
+):
+    """Get questions with a specific status, newest first (keyset-paginated via `cursor`)"""
+    query = db.query(Question).filter(Question.status == status)
+    total = query.count()
+    try:
+        questions, next_cursor = paginate_questions(query, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return [
+    return QuestionListResponse(questions=[
         QuestionResponse(
             id=q.id,
             question_text=q.question_text,
@@ -83,13 +132,18 @@ def get_questions_by_status(status: QuestionStatus, db: Session = Depends(get_db
             created_at=q.created_at
         )
         for q in questions
-    ]
+    ], total=total, next_cursor=next_cursor)
 
 
 @router.get("/duplicates/{question_id}", response_model=List[DuplicateMatchResponse])
 def get_duplicate_matches(question_id: int, db: Session = Depends(get_db)):
     """Get all duplicates flagged for a specific question"""
-    matches = db.query(DuplicateMatch).filter(DuplicateMatch.question_id == question_id).all()
+    matches = (
+        db.query(DuplicateMatch)
+        .options(joinedload(DuplicateMatch.match_question))
+        .filter(DuplicateMatch.question_id == question_id)
+        .all()
+    )
     
     results = []
     for m in matches:
@@ -133,6 +187,8 @@ def submit_for_deduplication(
         q.status = QuestionStatus.DEDUPE_APPROVED
     
     db.commit()
+    status_counts.invalidate()
+    publish_status_changes(questions)
     
     # Start the actual ML processing in the background
     background_tasks.add_task(run_bg_dedupe, request.question_ids)
@@ -156,7 +212,10 @@ def update_question_status(request: UpdateStatusRequest, db: Session = Depends(g
         log.process(f"Updating Question #{question.id} status: {question.status} -> {request.new_status}")
         question.status = request.new_status
     
+    sync_index(db, questions)
     db.commit()
+    status_counts.invalidate()
+    publish_status_changes(questions)
     log.success(f"Batch update successful. {len(questions)} questions updated.")
     
     return {"message": f"Successfully updated {len(questions)} questions to {request.new_status}", "count": len(questions)}
@@ -173,7 +232,10 @@ def link_questions(request: LinkQuestionsRequest, db: Session = Depends(get_db))
         # Just approve it and cleanup matches
         question.status = QuestionStatus.APPROVED
         db.query(DuplicateMatch).filter(DuplicateMatch.question_id == question.id).delete()
+        sync_index(db, [question])
         db.commit()
+        status_counts.invalidate()
+        publish_status_changes([question])
         return {"message": "Question ignored and marked as Approved"}
 
     target = db.query(Question).filter(Question.id == request.target_id).first()
@@ -200,7 +262,10 @@ def link_questions(request: LinkQuestionsRequest, db: Session = Depends(get_db))
 
     # Cleanup match records for this question once handled
     db.query(DuplicateMatch).filter(DuplicateMatch.question_id == question.id).delete()
+    sync_index(db, [question])
     db.commit()
+    status_counts.invalidate()
+    publish_status_changes([question])
     
     return {"message": f"Successfully linked as {request.relation_type}"}
 
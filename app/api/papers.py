@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.models.schemas import ExamVariantsRequest, ExamVariantsResponse, PaperAssembleRequest, PaperResponse
+from app.services.paper_assembler import PaperAssembler
+
+router = APIRouter(prefix="/api/v1/papers", tags=["Papers"])
+
+
+@router.post("/assemble", response_model=PaperResponse)
+def assemble_paper(
+    paper_request: PaperAssembleRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Assemble a question paper from the bank
+
+    Never selects a parent together with its child or two questions from one
+    parallel group. Aims for `total_marks`, the Bloom level mix in
+    `bloom_distribution` and at least one question per requested course
+    outcome; targets the bank cannot meet are listed in `warnings`.
+    """
+    return PaperAssembler(db).assemble(paper_request)
+
+
+@router.post("/variants", response_model=ExamVariantsResponse)
+def assemble_exam_variants(
+    variants_request: ExamVariantsRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Build `variant_count` versions of a paper in one pass
+
+    Each variant follows the same targets and relation rules as `/assemble`.
+    Any two variants share at most `max_overlap` questions. Members of one
+    parallel group fill the same slot in different variants, which keeps
+    difficulty and marks balanced between them.
+    """
+    return PaperAssembler(db).assemble_variants(variants_request)
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+import asyncio
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, BackgroundTasks, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.limiter import limiter
@@ -7,10 +10,19 @@ from app.models.schemas import (
     QuestionManualRequest,
     QuestionResponse,
     QuestionListResponse,
-    CourseOutcomeResponse
+    QuestionImportResponse,
+    CourseOutcomeResponse,
+    BloomLevel,
+    QuestionStatus as QuestionStatusSchema
 )
 from app.services.question_generator import QuestionGeneratorService
-from app.models.database import Question, QuestionStatus # Add Question and Status to use manually
+from app.services.question_writer import QuestionWriter
+from app.services.question_export import EXPORT_MEDIA_TYPES, export_questions, parquet_available
+from app.services.question_import import QuestionImporter, detect_format, iter_csv_rows, iter_jsonl_rows
+from app.services.embedding_store import run_bg_embed
+from app.services.vector_index import vector_index
+from app.services.status_counts import status_counts
+from app.models.database import Question
 from app.models.subject_topic import CourseOutcome
 
 router = APIRouter(prefix="/api/v1/questions", tags=["Questions"])
@@ -19,52 +31,63 @@ router = APIRouter(prefix="/api/v1/questions", tags=["Questions"])
 @router.post("/manual", response_model=QuestionResponse, status_code=201)
 def add_manual_question(
     request: QuestionManualRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Manually add a question to the bank (bypass AI generation)"""
-    new_question = Question(
+    selected_cos = []
+    if request.course_outcome_ids:
+        selected_cos = db.query(CourseOutcome).filter(CourseOutcome.id.in_(request.course_outcome_ids)).all()
+
+    writer = QuestionWriter(db)
+    writer.add(
         question_text=request.question_text,
         subject=request.subject,
         topic=request.topic,
         bloom_level=request.bloom_level,
         difficulty=request.difficulty,
         marks=request.marks,
-        status=QuestionStatus.DEDUPE_PENDING
-    )
-    db.add(new_question)
-    
-    # Link Course Outcomes for manual question
-    if request.course_outcome_ids:
-        selected_cos = db.query(CourseOutcome).filter(CourseOutcome.id.in_(request.course_outcome_ids)).all()
-        if selected_cos:
-            new_question.course_outcomes = selected_cos
-            
-    db.commit()
-    db.refresh(new_question)
-    
-    # We return the response format expected by frontend
-    from app.models.schemas import QuestionMetadata
-    return QuestionResponse(
-        id=new_question.id,
-        question_text=new_question.question_text,
-        status=new_question.status,
-        metadata=QuestionMetadata(
-            subject=new_question.subject,
-            topic=new_question.topic,
-            bloom_level=new_question.bloom_level,
-            difficulty=new_question.difficulty,
-            marks=new_question.marks
-        ),
-        course_outcomes=new_question.course_outcomes,
-        created_at=new_question.created_at
+        course_outcomes=selected_cos
     )
+    [response] = writer.save()
+
+    # Precompute the embedding so dedupe checks can read it back
+    background_tasks.add_task(run_bg_embed, [response.id])
+    return response
+
+
+@router.post("/import", response_model=QuestionImportResponse)
+def import_questions(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    format: str | None = Form(default=None),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk-import questions from a CSV (header row of QuestionManualRequest fields)
+    or JSONL file, streamed row by row
+
+    Valid rows are saved even when others fail; the report lists the failed
+    rows by line number. Embeddings for imported questions are computed in the
+    background.
+    """
+    try:
+        fmt = detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = iter_csv_rows(file.file) if fmt == "csv" else iter_jsonl_rows(file.file)
+    importer = QuestionImporter(db, on_chunk=lambda ids: background_tasks.add_task(run_bg_embed, ids))
+    return importer.run(rows)
 
 
 @router.post("/generate", response_model=list[QuestionResponse], status_code=201)
 @limiter.limit("5/minute")
-def generate_question(
+async def generate_question(
     request: Request,
+    response: Response,
     generate_request: QuestionGenerateRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -76,9 +99,48 @@ def generate_question(
     - **difficulty**: Question difficulty (Easy, Medium, Hard)
     - **marks**: Marks for the question (1-100)
     - **count**: Number of questions to generate (1-10)
+
+    If some questions fail or miss the generation deadline, the rest are still
+    returned and the `X-Questions-Missing` header says how many are missing.
     """
     service = QuestionGeneratorService(db)
-    return service.generate_questions(generate_request)
+    try:
+        questions = await service.generate_questions(generate_request)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Question generation timed out")
+    if service.shortfall:
+        response.headers["X-Questions-Missing"] = str(service.shortfall)
+    background_tasks.add_task(run_bg_embed, [q.id for q in questions])
+    return questions
+
+
+@router.get("/export")
+def export_question_bank(
+    format: Literal["jsonl", "csv", "parquet"] = "jsonl",
+    subject: str | None = None,
+    topic: str | None = None,
+    status: QuestionStatusSchema | None = None,
+    bloom_level: BloomLevel | None = None
+):
+    """
+    Stream the question bank (optionally filtered) as JSONL, CSV or Parquet
+
+    Rows are read in batches from a streaming cursor and sent as they are
+    encoded, so memory use does not depend on the size of the bank.
+    """
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow to be installed")
+    return StreamingResponse(
+        export_questions(
+            format,
+            subject=subject,
+            topic=topic,
+            status=status.value if status else None,
+            bloom_level=bloom_level.value if bloom_level else None
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="questions.{format}"'}
+    )
 
 
 @router.get("/{question_id}", response_model=QuestionResponse)
@@ -102,28 +164,29 @@ def list_questions(
     topic: str | None = None,
     bloom_level: str | None = None,
     limit: int = 50,
+    cursor: str | None = None,
     db: Session = Depends(get_db)
 ):
     """
-    List questions with optional filters
+    List questions with optional filters, newest first
     
     - **subject**: Filter by subject (optional)
     - **topic**: Filter by topic (optional)
     - **bloom_level**: Filter by Bloom's level (optional)
-    - **limit**: Maximum number of questions to return (default: 50)
+    - **limit**: Page size (default: 50, max: 200)
+    - **cursor**: `next_cursor` from the previous page (optional)
     """
     service = QuestionGeneratorService(db)
-    questions = service.list_questions(
-        subject=subject,
-        topic=topic,
-        bloom_level=bloom_level,
-        limit=limit
-    )
-    
-    return QuestionListResponse(
-        questions=questions,
-        total=len(questions)
-    )
+    try:
+        return service.list_questions(
+            subject=subject,
+            topic=topic,
+            bloom_level=bloom_level,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{question_id}", status_code=204)
 def delete_question(
@@ -137,4 +200,6 @@ def delete_question(
     
     db.delete(question)
     db.commit()
+    vector_index.remove([question_id])
+    status_counts.invalidate()
     return None
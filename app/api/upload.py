@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response, BackgroundTasks
 from sqlalchemy.orm import Session
+from app.core.config import get_settings
 from app.core.database import get_db
 from app.core.limiter import limiter
 from app.models.schemas import (
@@ -10,8 +11,12 @@ from app.models.schemas import (
 )
 from app.services.question_generator import QuestionGeneratorService
 from app.services.pdf_service import PDFService
+from app.services.embedding_store import run_bg_embed
+import asyncio
 import json
 
+settings = get_settings()
+
 router = APIRouter(prefix="/api/v1/generate-from-notes", tags=["Context Generation"])
 
 
@@ -19,6 +24,8 @@ router = APIRouter(prefix="/api/v1/generate-from-notes", tags=["Context Generati
 @limiter.limit("3/minute")
 async def generate_from_notes(
     request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     subject: str = Form(...),
     topic: str = Form(...),
@@ -28,10 +35,19 @@ async def generate_from_notes(
     count: int = Form(default=1),
     course_outcome_ids: list[int] = Form(default=[]),
     custom_prompt: str = Form(default=""),
+    first_page: int = Form(default=1),
+    last_page: int | None = Form(default=None),
+    max_chars: int | None = Form(default=None),
     db: Session = Depends(get_db)
 ):
     """
     Generate one or more questions from an uploaded PDF file
+    
+    The document's sha256 is returned in the `X-Content-Hash` header; later requests
+    can send just that hash to `/cached` instead of re-uploading the file.
+    
+    - **first_page** / **last_page**: Only read this page range (1-based, inclusive)
+    - **max_chars**: Stop extracting after this many characters (default: PDF_MAX_CHARS)
     """
     # Validate file type
     if not file.filename.endswith('.pdf'):
@@ -39,8 +55,12 @@ async def generate_from_notes(
     
     # Read and extract text
     try:
-        content = await file.read()
-        extracted_text = PDFService.extract_text(content)
+        extracted_text, content_hash = await PDFService.extract_upload(
+            file.file,
+            first_page=first_page,
+            last_page=last_page,
+            max_chars=max_chars or settings.PDF_MAX_CHARS
+        )
         
         if not extracted_text:
             raise HTTPException(status_code=400, detail="Could not extract text from PDF")
@@ -48,6 +68,72 @@ async def generate_from_notes(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
     
+    response.headers["X-Content-Hash"] = content_hash
+    
+    return await _generate_from_text(
+        db, response, background_tasks, extracted_text, subject, topic, bloom_level, difficulty,
+        marks, count, course_outcome_ids, custom_prompt
+    )
+
+
+@router.post("/cached", response_model=list[QuestionResponse])
+@limiter.limit("3/minute")
+async def generate_from_cached_notes(
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    content_hash: str = Form(...),
+    subject: str = Form(...),
+    topic: str = Form(...),
+    bloom_level: str = Form(...),
+    difficulty: str = Form(...),
+    marks: int = Form(...),
+    count: int = Form(default=1),
+    course_outcome_ids: list[int] = Form(default=[]),
+    custom_prompt: str = Form(default=""),
+    first_page: int = Form(default=1),
+    last_page: int | None = Form(default=None),
+    max_chars: int | None = Form(default=None),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate questions from a previously uploaded PDF, referenced by its sha256
+    
+    Page range and character budget must match the original upload.
+    Returns 404 if the document is not in the cache; upload it again in that case.
+    """
+    extracted_text = await asyncio.to_thread(
+        PDFService.get_cached_text,
+        content_hash,
+        first_page=first_page,
+        last_page=last_page,
+        max_chars=max_chars or settings.PDF_MAX_CHARS
+    )
+    if extracted_text is None:
+        raise HTTPException(status_code=404, detail="Document not found in cache, upload the PDF instead")
+    if not extracted_text:
+        raise HTTPException(status_code=400, detail="Could not extract text from PDF")
+    
+    return await _generate_from_text(
+        db, response, background_tasks, extracted_text, subject, topic, bloom_level, difficulty,
+        marks, count, course_outcome_ids, custom_prompt
+    )
+
+
+async def _generate_from_text(
+    db: Session,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    extracted_text: str,
+    subject: str,
+    topic: str,
+    bloom_level: str,
+    difficulty: str,
+    marks: int,
+    count: int,
+    course_outcome_ids: list[int],
+    custom_prompt: str
+) -> list[QuestionResponse]:
     # Create request object
     try:
         request_data = QuestionGenerateRequest(
@@ -64,8 +150,15 @@ async def generate_from_notes(
     
     # Generate question
     service = QuestionGeneratorService(db)
-    return service.generate_questions_from_context(
-        context=extracted_text,
-        request=request_data,
-        custom_prompt=custom_prompt
-    )
+    try:
+        questions = await service.generate_questions_from_context(
+            context=extracted_text,
+            request=request_data,
+            custom_prompt=custom_prompt
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Question generation timed out")
+    if service.shortfall:
+        response.headers["X-Questions-Missing"] = str(service.shortfall)
+    background_tasks.add_task(run_bg_embed, [q.id for q in questions])
+    return questions
@@ -1,3 +1,4 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -6,6 +7,18 @@ class Settings(BaseSettings):
     # Groq API
     GROQ_API_KEY: str
     MODEL: str = "llama-3.3-70b-versatile"
+    LLM_MAX_CONCURRENCY: int = 4  # Concurrent Groq calls per event loop
+    LLM_REQUEST_TIMEOUT: float = 30.0  # Seconds allowed for a single LLM call
+    GENERATION_DEADLINE: float = 90.0  # Seconds allowed for a whole generation request
+    BATCH_MAX_WORKERS: int = 4  # Batch plan entries generated at once
+    BATCH_CLAIM_TIMEOUT_SECONDS: float = 300.0  # RUNNING entries claimed longer ago count as interrupted on resume
+    
+    # LLM response cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = "llm_cache.db"
+    LLM_CACHE_MAX_ENTRIES: int = 20000
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_TEMPERATURE: float = 0.0  # Only deterministic calls are cached
     
     # Database
     DATABASE_URL: str
@@ -13,6 +26,53 @@ class Settings(BaseSettings):
     # API
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
+    WARMUP_ON_STARTUP: bool = False  # Load models and the dedupe index before serving requests
+    DASHBOARD_STATS_TTL_SECONDS: float = 5.0  # How long /dashboard/stats reuses its counts
+    IMPORT_CHUNK_SIZE: int = 500  # Rows written per transaction by the bulk import
+    IMPORT_MAX_REPORTED_ERRORS: int = 1000  # Failed rows listed in the import report
+    EXPORT_BATCH_SIZE: int = 1000  # Rows per page query of the streaming export
+    
+    # PDF extraction
+    PDF_EXTRACT_WORKERS: int = 4  # Processes extracting pages in parallel
+    PDF_PAGES_PER_TASK: int = 8
+    PDF_MAX_CHARS: int = 200_000  # Default character budget for uploaded notes
+    PDF_CACHE_ENABLED: bool = True
+    PDF_CACHE_PATH: str = "document_cache.db"
+    PDF_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    
+    # Context retrieval for generation from notes
+    CONTEXT_CHUNK_CHARS: int = 1200
+    CONTEXT_CHUNK_OVERLAP: int = 150
+    CONTEXT_CHUNKS_PER_QUESTION: int = 4
+    
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" lines, or "console" for the coloured format
+    LOG_QUEUE_SIZE: int = 10000  # Records buffered for the writer thread; extra records are dropped
+    LOG_PAIR_SAMPLE_RATE: float = 0.1  # Share of per-pair dedupe messages kept
+    
+    # Deduplication vector index
+    DEDUPE_TOP_K: int = 10
+    DEDUPE_HNSW_MIN_SIZE: int = 5000  # Partitions smaller than this use exact NumPy search
+    DEDUPE_HNSW_M: int = 16
+    DEDUPE_HNSW_EF_CONSTRUCTION: int = 200
+    DEDUPE_HNSW_EF_SEARCH: int = 64
+    DEDUPE_INDEX_REFRESH_SECONDS: int = 60
+    
+    # Embeddings
+    EMBEDDING_SERVICE_SOCKET: str | None = None  # Unix socket of a shared embedding service (see embedding_service.py)
+    EMBEDDING_SERVICE_AUTHKEY: str | None = None  # Shared secret, required with EMBEDDING_SERVICE_SOCKET
+    EMBEDDING_SERVICE_TIMEOUT_SECONDS: float = 10.0  # Wait this long for a reply before encoding in-process
+    EMBEDDING_SERVICE_RETRY_SECONDS: float = 30.0  # Encode in-process this long after the service fails
+    EMBEDDING_BATCHING_ENABLED: bool = True  # Coalesce concurrent in-process encode calls
+    EMBEDDING_BATCH_MAX_SIZE: int = 64  # Sentences per batched encode
+    EMBEDDING_BATCH_WAIT_MS: float = 5.0  # How long to wait for more requests before encoding
+    
+    @model_validator(mode="after")
+    def _require_embedding_service_authkey(self):
+        if self.EMBEDDING_SERVICE_SOCKET and not self.EMBEDDING_SERVICE_AUTHKEY:
+            raise ValueError("EMBEDDING_SERVICE_AUTHKEY must be set when EMBEDDING_SERVICE_SOCKET is")
+        return self
     
     class Config:
         env_file = ".env"
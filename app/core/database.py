@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import get_settings
+from app.core.metrics import db_commit_seconds, db_query_seconds
 
 settings = get_settings()
 
@@ -11,6 +14,45 @@ engine = create_engine(
     pool_pre_ping=True
 )
 
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, so a statement that raises leaves nothing behind
+    if context is not None:
+        context.query_started = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        db_query_seconds.observe(
+            time.perf_counter() - context.query_started, statement=statement.split(None, 1)[0].upper()
+        )
+
+
+# The engine's commit event fires just before COMMIT and the session's after_commit
+# just after it, in the same thread
+_commit_timer = threading.local()
+
+
+@event.listens_for(engine, "commit")
+def _start_commit_timer(conn):
+    _commit_timer.started = time.perf_counter()
+
+
+@event.listens_for(engine, "rollback")
+def _clear_commit_timer(conn):
+    _commit_timer.started = None
+
+
+@event.listens_for(Session, "after_commit")
+def _record_commit_time(session):
+    started = getattr(_commit_timer, "started", None)
+    if started is not None:
+        db_commit_seconds.observe(time.perf_counter() - started)
+        _commit_timer.started = None
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
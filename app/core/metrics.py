@@ -0,0 +1,174 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# Seconds; covers sub-millisecond DB queries up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels, rendered in Prometheus text format"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge:
+    """Value that can go up and down, with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, rendered in Prometheus text format"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Per label set: (per-bucket counts incl. +Inf, sum)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+_registry: List = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Startup
+startup_seconds = _register(Gauge(
+    "app_startup_duration_seconds", "Time spent starting the app by phase (imports, warmup, total)", ("phase",)
+))
+
+# Logging
+log_records_dropped = _register(Counter("log_records_dropped_total", "Log records dropped because the log queue was full"))
+
+# HTTP
+http_request_seconds = _register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+))
+
+# LLM
+llm_request_seconds = _register(Histogram(
+    "llm_request_duration_seconds", "Groq call latency (cache hits excluded)", ("mode", "outcome")
+))
+llm_tokens = _register(Counter("llm_tokens_total", "Tokens reported by the LLM", ("type",)))
+
+# Caches (LLM responses, pair verdicts, document text/chunks, question embeddings)
+cache_requests = _register(Counter("cache_requests_total", "Cache lookups by cache and result", ("cache", "result")))
+
+# Deduplication
+dedupe_layer_seconds = _register(Histogram(
+    "dedupe_layer_duration_seconds",
+    "Dedupe time per layer: per batch for embedding/vector_search/lexical, per LLM call for llm",
+    ("layer",)
+))
+dedupe_questions = _register(Counter("dedupe_questions_total", "Questions checked by verdict", ("verdict",)))
+
+# Embeddings
+embedding_encode_seconds = _register(Histogram(
+    "embedding_encode_duration_seconds", "SentenceTransformer encode latency", ("caller",)
+))
+embedding_batch_sentences = _register(Histogram(
+    "embedding_batch_sentences", "Sentences per batched model.encode call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+))
+
+# PDF
+pdf_extract_seconds = _register(Histogram("pdf_extract_duration_seconds", "PDF text extraction latency"))
+pdf_pages = _register(Counter("pdf_pages_extracted_total", "Pages extracted from PDFs"))
+
+# Database
+db_query_seconds = _register(Histogram("db_query_duration_seconds", "SQL statement latency", ("statement",)))
+db_commit_seconds = _register(Histogram("db_commit_duration_seconds", "Transaction COMMIT latency"))
@@ -1,24 +1,97 @@
+import asyncio
+import logging
 from fastapi import WebSocket
-from typing import List
+from typing import Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+SEND_QUEUE_SIZE = 256  # Messages buffered per client
+SEND_TIMEOUT = 5.0  # Seconds a full client queue may hold up a broadcast before the client is dropped
+
 
 class ConnectionManager:
+    """
+    Dashboard WebSocket clients.
+
+    Every client has its own send queue drained by its own task, so a slow
+    client only ever delays itself; one that stays full for SEND_TIMEOUT is
+    disconnected.
+    """
+
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Dict[WebSocket, asyncio.Queue] = {}
+        self._senders: Dict[WebSocket, asyncio.Task] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.active_connections[websocket] = queue
+        self._senders[websocket] = asyncio.create_task(self._send_loop(websocket, queue))
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.pop(websocket, None)
+        sender = self._senders.pop(websocket, None)
+        if sender is not None:
+            sender.cancel()
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                # Handle disconnected clients that didn't close cleanly
-                pass
+        await asyncio.gather(*[
+            self._enqueue(websocket, queue, message)
+            for websocket, queue in list(self.active_connections.items())
+        ])
+
+    def publish(self, message: dict):
+        """
+        Fire-and-forget broadcast that can be called from any thread
+
+        Sync endpoints and background tasks run in worker threads, so the
+        broadcast is handed over to the event loop the clients live on.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self.active_connections:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.create_task(self.broadcast(message))
+        else:
+            asyncio.run_coroutine_threadsafe(self.broadcast(message), loop)
+
+    async def _enqueue(self, websocket: WebSocket, queue: asyncio.Queue, message: dict):
+        try:
+            await asyncio.wait_for(queue.put(message), timeout=SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Dropping dashboard client that stopped reading events")
+            self.disconnect(websocket)
+
+    async def _send_loop(self, websocket: WebSocket, queue: asyncio.Queue):
+        try:
+            while True:
+                message = await queue.get()
+                await websocket.send_json(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Handle disconnected clients that didn't close cleanly
+            self.disconnect(websocket)
+
 
 manager = ConnectionManager()
+
+
+def publish_status_changes(questions: Iterable):
+    """Tell dashboards about questions whose status just changed"""
+    changes = [{"id": q.id, "status": q.status.value} for q in questions]
+    if changes:
+        manager.publish({"type": "status_changed", "questions": changes})
+
+
+def publish_new_questions(questions: Iterable):
+    """Tell dashboards about newly added questions"""
+    created = [{"id": q.id, "status": q.status.value} for q in questions]
+    if created:
+        manager.publish({"type": "questions_created", "questions": created})
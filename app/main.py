@@ -1,21 +1,54 @@
+import time
+
+# Measured before anything else is imported so the startup report covers all module imports
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from app.core.database import engine, Base
 from fastapi.staticfiles import StaticFiles
-from app.api import questions, batch, metadata, dashboard, upload
+from app.api import questions, batch, metadata, dashboard, upload, papers
 
+from app.core.config import get_settings
 from app.core.limiter import limiter
+from app.core.metrics import http_request_seconds, render_metrics, startup_seconds
+from app.services.logger_service import correlation_scope, setup_logging
+
+import_seconds = time.perf_counter() - _import_started
+startup_seconds.set(import_seconds, phase="imports")
+
+# Structured, queue-backed logging for the whole process
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Optionally warm up heavy models, then report how long startup took"""
+    if get_settings().WARMUP_ON_STARTUP:
+        from app.services.warmup import warm_up
+        startup_seconds.set(await asyncio.to_thread(warm_up), phase="warmup")
+    total = time.perf_counter() - _import_started
+    startup_seconds.set(total, phase="total")
+    logger.info(f"Startup finished in {total:.2f}s (imports {import_seconds:.2f}s)")
+    yield
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Academic Question Generator API",
     description="Generate Bloom's Taxonomy-compliant examination questions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -27,14 +60,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Content-Hash", "X-Questions-Missing"],
 )
 
+
+@app.middleware("http")
+async def assign_correlation_id(request: Request, call_next):
+    """Tag logs of each request (and its background tasks) with X-Request-ID or a fresh id"""
+    with correlation_scope(request.headers.get("X-Request-ID")) as cid:
+        started = time.perf_counter()
+        response = await call_next(request)
+    # Label by route template (/questions/{question_id}), not raw path, to keep cardinality bounded
+    route = request.scope.get("route")
+    http_request_seconds.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=route.path if route is not None else "static",
+        status=response.status_code
+    )
+    response.headers["X-Request-ID"] = cid
+    return response
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text-format metrics"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # Include routers
 app.include_router(questions.router)
 app.include_router(batch.router)
 app.include_router(metadata.router)
 app.include_router(dashboard.router)
 app.include_router(upload.router)
+app.include_router(papers.router)
 
 # Mount frontend
 app.mount("/frontend", StaticFiles(directory="frontend"), name="frontend")
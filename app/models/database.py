@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, TIMESTAMP, Float, Table
+from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, TIMESTAMP, DateTime, Float, Table, LargeBinary, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -27,6 +27,13 @@ class QuestionStatus(str, enum.Enum):
     APPROVED = "APPROVED"
 
 
+class BatchQuestionStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+
 # Association table must be defined before Question
 question_course_outcomes = Table(
     "question_course_outcomes",
@@ -38,6 +45,10 @@ question_course_outcomes = Table(
 
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        # Serves status-filtered listings ordered by creation time (keyset pagination)
+        Index("ix_questions_status_created_at", "status", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     subject = Column(String(255), nullable=False, index=True)
@@ -57,11 +68,26 @@ class Question(Base):
     batch_questions = relationship("BatchQuestion", back_populates="question")
     duplicate_results = relationship("DuplicateMatch", foreign_keys="DuplicateMatch.question_id", back_populates="question")
     course_outcomes = relationship("CourseOutcome", secondary=question_course_outcomes, backref="questions")
+    embedding = relationship("QuestionEmbedding", uselist=False, back_populates="question", cascade="all, delete-orphan")
     
     # Self-referential relationship for Hierarchy
     children = relationship("Question", backref="parent", remote_side=[id])
 
 
+class QuestionEmbedding(Base):
+    __tablename__ = "question_embeddings"
+    
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    model_name = Column(String(100), nullable=False)
+    text_hash = Column(String(64), nullable=False)  # sha256 of question_text at encode time
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # Normalized float32 vector
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    
+    # Relationship
+    question = relationship("Question", back_populates="embedding")
+
+
 class DuplicateMatch(Base):
     __tablename__ = "duplicate_matches"
     
@@ -77,11 +103,28 @@ class DuplicateMatch(Base):
     match_question = relationship("Question", foreign_keys=[match_question_id])
 
 
+class PairVerdict(Base):
+    __tablename__ = "pair_verdicts"
+    __table_args__ = (
+        UniqueConstraint("hash_a", "hash_b", "model_name", name="uniq_pair_verdict"),
+    )
+    
+    # Text hashes ordered so that hash_a < hash_b; the verdict reads "Q(hash_a) <verdict> Q(hash_b)"
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    hash_a = Column(String(64), nullable=False)
+    hash_b = Column(String(64), nullable=False)
+    model_name = Column(String(100), nullable=False)
+    verdict = Column(String(50), nullable=False)
+    reason = Column(Text)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+
 class BatchPlan(Base):
     __tablename__ = "batch_plans"
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     plan_name = Column(String(255))
+    subject = Column(String(255))
     total_questions = Column(Integer)
     created_at = Column(TIMESTAMP, server_default=func.now())
     
@@ -94,9 +137,20 @@ class BatchQuestion(Base):
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     batch_plan_id = Column(Integer, ForeignKey("batch_plans.id"))
-    question_id = Column(Integer, ForeignKey("questions.id"))
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=True)  # Set once generated
     sequence_number = Column(Integer)
     
+    # Spec and job state, so a plan can be processed in the background and resumed
+    topic = Column(String(255))
+    bloom_level = Column(Enum(BloomLevel, native_enum=False))
+    difficulty = Column(Enum(Difficulty, native_enum=False))
+    marks = Column(Integer)
+    status = Column(Enum(BatchQuestionStatus, native_enum=False), nullable=False, default=BatchQuestionStatus.PENDING, index=True)
+    error = Column(Text)
+    # Set when a worker claims the entry; only the claim holder records the result
+    claim_token = Column(String(32))
+    claimed_at = Column(DateTime)
+    
     # Relationships
     batch_plan = relationship("BatchPlan", back_populates="batch_questions")
     question = relationship("Question", back_populates="batch_questions")
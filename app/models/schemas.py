@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+import math
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Optional
 from enum import Enum
 from datetime import datetime
 
@@ -26,8 +27,6 @@ class QuestionStatus(str, Enum):
     APPROVED = "APPROVED"
 
 
-
-
 # Request Schemas
 
 class SubjectResponse(BaseModel):
@@ -157,6 +156,18 @@ class BatchPlanResponse(BaseModel):
         from_attributes = True
 
 
+class BatchPlanStatusResponse(BaseModel):
+    id: int
+    plan_name: str
+    total_questions: int
+    pending: int
+    running: int
+    completed: int
+    failed: int
+    is_finished: bool
+    created_at: datetime
+
+
 class DuplicateMatchResponse(BaseModel):
     id: int
     match_question: QuestionResponse
@@ -171,3 +182,64 @@ class DuplicateMatchResponse(BaseModel):
 class QuestionListResponse(BaseModel):
     questions: List[QuestionResponse]
     total: int
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to fetch the next page
+
+
+class ImportRowError(BaseModel):
+    row: int  # Line number in the uploaded file (where the row ends, for multi-line CSV records)
+    errors: List[str]
+
+
+class QuestionImportResponse(BaseModel):
+    total_rows: int
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool = False  # More rows failed than IMPORT_MAX_REPORTED_ERRORS
+
+
+class PaperAssembleRequest(BaseModel):
+    subject: str = Field(..., min_length=1, description="Subject to draw questions from")
+    question_count: int = Field(..., ge=1, le=200, description="Number of questions in the paper")
+    total_marks: Optional[int] = Field(default=None, ge=1, description="Target total marks")
+    bloom_distribution: Dict[BloomLevel, float] = Field(
+        default={}, description="Relative weight of each Bloom level, e.g. {\"RBT1\": 1, \"RBT3\": 2}"
+    )
+    course_outcome_ids: List[int] = Field(default=[], description="Course outcomes the paper must cover")
+    topics: List[str] = Field(default=[], description="Restrict to these topics (all when empty)")
+    statuses: List[QuestionStatus] = Field(
+        default=[QuestionStatus.APPROVED, QuestionStatus.DEDUPE_APPROVED],
+        description="Question statuses eligible for the paper"
+    )
+    seed: Optional[int] = Field(default=None, description="Fix to get the same paper for the same bank")
+
+    @field_validator("bloom_distribution")
+    @classmethod
+    def check_bloom_weights(cls, distribution: Dict[BloomLevel, float]) -> Dict[BloomLevel, float]:
+        # Empty means unconstrained; otherwise the weights must split the paper into real shares
+        if distribution and (
+            not all(math.isfinite(weight) and weight >= 0 for weight in distribution.values())
+            or sum(distribution.values()) <= 0
+        ):
+            raise ValueError("Bloom weights must be finite, non-negative and not all zero")
+        return distribution
+
+
+class PaperResponse(BaseModel):
+    questions: List[QuestionResponse]
+    total_marks: int
+    bloom_counts: Dict[BloomLevel, int]
+    difficulty_counts: Dict[Difficulty, int]
+    covered_course_outcome_ids: List[int]
+    missing_course_outcome_ids: List[int]
+    warnings: List[str] = []  # Targets the bank could not meet
+
+
+class ExamVariantsRequest(PaperAssembleRequest):
+    variant_count: int = Field(..., ge=1, le=26, description="Number of exam variants to build")
+    max_overlap: int = Field(default=0, ge=0, description="Most questions any two variants may share")
+
+
+class ExamVariantsResponse(BaseModel):
+    variants: List[PaperResponse]
+    overlap: List[List[int]]  # overlap[a][b]: questions shared by variants a and b (diagonal: variant size)
@@ -1,97 +1,251 @@
-from sqlalchemy.orm import Session
-from app.models.database import BatchPlan, BatchQuestion
-from app.models.schemas import BatchPlanRequest, BatchPlanResponse, QuestionGenerateRequest
-from app.services.question_generator import QuestionGeneratorService
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, joinedload
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models.database import BatchPlan, BatchQuestion, BatchQuestionStatus, Question
+from app.models.schemas import BatchPlanRequest, BatchPlanResponse, BatchPlanStatusResponse, QuestionGenerateRequest
+from app.services.logger_service import correlation_scope, new_correlation_id
+from app.services.question_generator import QuestionGeneratorService, to_question_response
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 class BatchService:
     """Service for batch question generation"""
-    
+
     def __init__(self, db: Session):
         self.db = db
         self.question_service = QuestionGeneratorService(db)
-    
-    def create_batch_plan(self, request: BatchPlanRequest) -> BatchPlanResponse:
+
+    def create_batch_plan(self, request: BatchPlanRequest) -> BatchPlanStatusResponse:
         """
-        Create a batch plan and generate all questions
-        
+        Create a batch plan and queue one PENDING entry per question spec
+
+        Generation happens in the background (see run_batch_plan).
+
         Args:
             request: Batch plan request with question specifications
-            
+
         Returns:
-            BatchPlanResponse with all generated questions
+            BatchPlanStatusResponse with the job id and initial counts
         """
-        # Create batch plan
         batch_plan = BatchPlan(
             plan_name=request.plan_name,
+            subject=request.subject,
             total_questions=len(request.questions)
         )
-        
         self.db.add(batch_plan)
-        self.db.commit()
-        self.db.refresh(batch_plan)
-        
-        # Generate questions one by one
-        generated_questions = []
-        
-        for idx, question_spec in enumerate(request.questions, start=1):
-            # Create question request
-            question_request = QuestionGenerateRequest(
-                subject=request.subject,
+        self.db.flush()
+
+        self.db.add_all([
+            BatchQuestion(
+                batch_plan_id=batch_plan.id,
+                sequence_number=idx,
                 topic=question_spec.topic,
                 bloom_level=question_spec.bloom_level,
                 difficulty=question_spec.difficulty,
-                marks=question_spec.marks
-            )
-            
-            # Generate question
-            question_response = self.question_service.generate_question(question_request)
-            
-            # Link to batch
-            batch_question = BatchQuestion(
-                batch_plan_id=batch_plan.id,
-                question_id=question_response.id,
-                sequence_number=idx
+                marks=question_spec.marks,
+                status=BatchQuestionStatus.PENDING
             )
-            
-            self.db.add(batch_question)
-            generated_questions.append(question_response)
-        
+            for idx, question_spec in enumerate(request.questions, start=1)
+        ])
         self.db.commit()
-        
-        # Build response
-        return BatchPlanResponse(
+        self.db.refresh(batch_plan)
+
+        return self.get_batch_status(batch_plan.id)
+
+    def get_batch_status(self, batch_id: int) -> BatchPlanStatusResponse | None:
+        """Get per-state counts of a batch plan's questions"""
+        batch_plan = self.db.query(BatchPlan).filter(BatchPlan.id == batch_id).first()
+
+        if not batch_plan:
+            return None
+
+        counts = dict(
+            self.db.query(BatchQuestion.status, func.count(BatchQuestion.id))
+            .filter(BatchQuestion.batch_plan_id == batch_id)
+            .group_by(BatchQuestion.status)
+            .all()
+        )
+        pending = counts.get(BatchQuestionStatus.PENDING, 0)
+        running = counts.get(BatchQuestionStatus.RUNNING, 0)
+
+        return BatchPlanStatusResponse(
             id=batch_plan.id,
             plan_name=batch_plan.plan_name,
             total_questions=batch_plan.total_questions,
-            questions=generated_questions,
+            pending=pending,
+            running=running,
+            completed=counts.get(BatchQuestionStatus.COMPLETED, 0),
+            failed=counts.get(BatchQuestionStatus.FAILED, 0),
+            is_finished=pending == 0 and running == 0,
             created_at=batch_plan.created_at
         )
-    
+
+    def requeue_batch_plan(self, batch_id: int) -> int:
+        """
+        Move failed and interrupted entries back to PENDING so the plan can be resumed
+
+        A RUNNING entry only counts as interrupted once its claim is older than
+        BATCH_CLAIM_TIMEOUT_SECONDS, so entries another worker is still
+        generating are left alone.
+
+        Returns:
+            Number of entries re-queued
+        """
+        cutoff = _utcnow() - timedelta(seconds=settings.BATCH_CLAIM_TIMEOUT_SECONDS)
+        requeued = self.db.query(BatchQuestion).filter(
+            BatchQuestion.batch_plan_id == batch_id,
+            or_(
+                BatchQuestion.status == BatchQuestionStatus.FAILED,
+                (BatchQuestion.status == BatchQuestionStatus.RUNNING)
+                & or_(BatchQuestion.claimed_at.is_(None), BatchQuestion.claimed_at < cutoff)
+            )
+        ).update(
+            {"status": BatchQuestionStatus.PENDING, "error": None, "claim_token": None, "claimed_at": None},
+            synchronize_session=False
+        )
+        self.db.commit()
+        return requeued
+
     def get_batch_plan(self, batch_id: int) -> BatchPlanResponse | None:
-        """Get a batch plan by ID with all questions"""
+        """Get a batch plan by ID with all generated questions"""
         batch_plan = self.db.query(BatchPlan).filter(BatchPlan.id == batch_id).first()
-        
+
         if not batch_plan:
             return None
-        
-        # Get all questions in order
+
+        # Generated questions in order, joined in the same query; their course outcomes
+        # follow in one more, so the plan loads in three queries whatever its size
         batch_questions = (
             self.db.query(BatchQuestion)
-            .filter(BatchQuestion.batch_plan_id == batch_id)
+            .options(joinedload(BatchQuestion.question).selectinload(Question.course_outcomes))
+            .filter(
+                BatchQuestion.batch_plan_id == batch_id,
+                BatchQuestion.question_id.isnot(None)
+            )
             .order_by(BatchQuestion.sequence_number)
             .all()
         )
-        
-        questions = [
-            self.question_service.get_question_by_id(bq.question_id)
-            for bq in batch_questions
-        ]
-        
+
         return BatchPlanResponse(
             id=batch_plan.id,
             plan_name=batch_plan.plan_name,
             total_questions=batch_plan.total_questions,
-            questions=[q for q in questions if q is not None],
+            questions=[to_question_response(bq.question) for bq in batch_questions if bq.question is not None],
             created_at=batch_plan.created_at
         )
+
+
+def _claim_entry(batch_question_id: int, subject: str) -> tuple[str, QuestionGenerateRequest] | None:
+    """
+    Move a PENDING entry to RUNNING under a new claim token
+
+    The conditional UPDATE lets exactly one worker, in any process, win the
+    entry. Returns None if it was not PENDING any more.
+    """
+    token = uuid.uuid4().hex
+    db = SessionLocal()
+    try:
+        claimed = db.query(BatchQuestion).filter(
+            BatchQuestion.id == batch_question_id,
+            BatchQuestion.status == BatchQuestionStatus.PENDING
+        ).update(
+            {"status": BatchQuestionStatus.RUNNING, "claim_token": token, "claimed_at": _utcnow(), "error": None},
+            synchronize_session=False
+        )
+        db.commit()
+        if not claimed:
+            return None
+        batch_question = db.query(BatchQuestion).filter(BatchQuestion.id == batch_question_id).first()
+        return token, QuestionGenerateRequest(
+            subject=subject,
+            topic=batch_question.topic,
+            bloom_level=batch_question.bloom_level,
+            difficulty=batch_question.difficulty,
+            marks=batch_question.marks
+        )
+    finally:
+        db.close()
+
+
+def _finish_entry(db: Session, batch_question_id: int, token: str, values: dict):
+    """Record the outcome, unless the entry was re-queued and claimed again meanwhile"""
+    updated = db.query(BatchQuestion).filter(
+        BatchQuestion.id == batch_question_id,
+        BatchQuestion.claim_token == token
+    ).update(values, synchronize_session=False)
+    db.commit()
+    if not updated:
+        logger.warning(f"Batch question #{batch_question_id} was claimed again while running, result not recorded")
+
+
+async def _process_batch_question(batch_question_id: int, subject: str, workers: asyncio.Semaphore):
+    """Generate the question for one batch entry and record the outcome"""
+    async with workers:
+        # Sync SQLAlchemy work runs in threads so the event loop only awaits the LLM
+        claim = await asyncio.to_thread(_claim_entry, batch_question_id, subject)
+        if claim is None:
+            return
+        token, question_request = claim
+
+        db = SessionLocal()
+        try:
+            try:
+                generated = await QuestionGeneratorService(db).generate_questions(question_request)
+                outcome = {"question_id": generated[0].id, "status": BatchQuestionStatus.COMPLETED, "error": None}
+            except Exception as e:
+                logger.error(f"Batch question #{batch_question_id} failed: {e}")
+                await asyncio.to_thread(db.rollback)
+                outcome = {"status": BatchQuestionStatus.FAILED, "error": str(e) or type(e).__name__}
+            await asyncio.to_thread(_finish_entry, db, batch_question_id, token, outcome)
+        finally:
+            await asyncio.to_thread(db.close)
+
+
+async def run_batch_plan(batch_id: int):
+    """
+    Background job: generate every PENDING entry of a batch plan concurrently
+
+    Entries are claimed one by one in the database, so several runs of the same
+    plan (e.g. on different workers) never generate an entry twice.
+    """
+    with correlation_scope(new_correlation_id(f"batch-{batch_id}-")):
+        await _run_batch_plan(batch_id)
+
+
+def _pending_entries(batch_id: int) -> tuple[str | None, list[int]]:
+    db = SessionLocal()
+    try:
+        subject = db.query(BatchPlan.subject).filter(BatchPlan.id == batch_id).scalar()
+        pending_ids = [
+            bq_id for (bq_id,) in db.query(BatchQuestion.id).filter(
+                BatchQuestion.batch_plan_id == batch_id,
+                BatchQuestion.status == BatchQuestionStatus.PENDING
+            ).order_by(BatchQuestion.sequence_number)
+        ]
+        return subject, pending_ids
+    finally:
+        db.close()
+
+
+async def _run_batch_plan(batch_id: int):
+    subject, pending_ids = await asyncio.to_thread(_pending_entries, batch_id)
+
+    logger.info(f"Processing batch plan #{batch_id}: {len(pending_ids)} pending questions")
+    workers = asyncio.Semaphore(settings.BATCH_MAX_WORKERS)
+    await asyncio.gather(*[
+        _process_batch_question(bq_id, subject, workers)
+        for bq_id in pending_ids
+    ], return_exceptions=True)
+    logger.info(f"Batch plan #{batch_id} finished")
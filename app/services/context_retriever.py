@@ -0,0 +1,117 @@
+import hashlib
+import logging
+import re
+from typing import List
+import numpy as np
+from app.core.config import get_settings
+from app.core.metrics import embedding_encode_seconds
+from app.services.embedding_store import EMBEDDING_MODEL_NAME, EmbeddingStore
+from app.services.pdf_service import document_cache
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+
+def chunk_text(text: str, chunk_chars: int, overlap: int) -> List[str]:
+    """
+    Split text into chunks of about `chunk_chars` characters on sentence boundaries
+
+    Consecutive chunks share up to `overlap` trailing characters so an idea cut
+    at a boundary still appears whole in one of them.
+    """
+    sentences = [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s and s.strip()]
+    chunks = []
+    current: List[str] = []
+    size = 0
+    for sentence in sentences:
+        # Sentences longer than a chunk (tables, run-on extraction) are hard-split
+        pieces = [sentence[i:i + chunk_chars] for i in range(0, len(sentence), chunk_chars)]
+        for piece in pieces:
+            if current and size + len(piece) > chunk_chars:
+                chunks.append(" ".join(current))
+                tail = []
+                tail_size = 0
+                for previous in reversed(current):
+                    if tail_size + len(previous) > overlap:
+                        break
+                    tail.insert(0, previous)
+                    tail_size += len(previous) + 1
+                current, size = tail, tail_size
+            current.append(piece)
+            size += len(piece) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class ContextRetriever:
+    """
+    Picks the parts of a long document that are relevant to the requested topic.
+
+    The document is chunked and embedded with the same MiniLM model used for
+    deduplication; chunk vectors are cached by text hash in the document cache.
+    Each of the `count` questions gets its own slice of the best-ranked chunks.
+    """
+
+    def __init__(self, model=None):
+        self._model = model
+
+    @property
+    def model(self):
+        """Loaded on first use, so documents short enough to return whole never need it"""
+        if self._model is None:
+            self._model = EmbeddingStore.get_model()
+        return self._model
+
+    def select_contexts(self, context: str, query: str, count: int) -> List[str]:
+        """
+        Build one context excerpt per question
+
+        Args:
+            context: Full document text
+            query: What the questions should be about (subject, topic, instructions)
+            count: Number of questions to build excerpts for
+
+        Returns:
+            `count` excerpts of up to CONTEXT_CHUNKS_PER_QUESTION chunks, in document order
+        """
+        per_question = settings.CONTEXT_CHUNKS_PER_QUESTION
+        chunks = chunk_text(context, settings.CONTEXT_CHUNK_CHARS, settings.CONTEXT_CHUNK_OVERLAP)
+        if len(chunks) <= per_question:
+            return [context] * count
+
+        chunk_vectors = self._chunk_vectors(context, chunks)
+        query_vector = self._encode([query])[0]
+        ranked = np.argsort(-(chunk_vectors @ query_vector), kind="stable")
+
+        # Deal ranked chunks round-robin so question i gets ranks i, i+count, i+2*count, ...;
+        # when the document is too short for disjoint slices, chunks are reused
+        excerpts = []
+        for i in range(count):
+            picks = [int(ranked[(i + j * count) % len(ranked)]) for j in range(per_question)]
+            excerpts.append("\n\n".join(chunks[idx] for idx in sorted(set(picks))))
+        logger.info(f"Selected {per_question} of {len(chunks)} chunks for each of {count} questions")
+        return excerpts
+
+    def _chunk_vectors(self, context: str, chunks: List[str]) -> np.ndarray:
+        key = "{}:chunks:{}:{}:{}".format(
+            hashlib.sha256(context.encode("utf-8")).hexdigest(),
+            EMBEDDING_MODEL_NAME,
+            settings.CONTEXT_CHUNK_CHARS,
+            settings.CONTEXT_CHUNK_OVERLAP
+        )
+        cached = document_cache.get(key) if document_cache is not None else None
+        if cached is not None:
+            return np.frombuffer(cached, dtype=np.float32).reshape(len(chunks), -1)
+
+        vectors = self._encode(chunks)
+        if document_cache is not None:
+            document_cache.set(key, vectors.tobytes())
+        return vectors
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        with embedding_encode_seconds.time(caller="context"):
+            vectors = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
@@ -1,54 +1,99 @@
-import torch
-from sentence_transformers import SentenceTransformer, util
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models.database import Question, QuestionStatus, DuplicateMatch
+from app.models.database import Question, QuestionStatus, DuplicateMatch, PairVerdict
 from app.core.config import get_settings
-from langchain_openai import ChatOpenAI
+from app.core.database import SessionLocal
+from app.core.metrics import cache_requests, dedupe_layer_seconds, dedupe_questions
+from app.services.embedding_store import EmbeddingStore, text_hash
+from app.services.vector_index import vector_index
+from app.services.lexical_index import get_numbers
+from app.services.llm_client import reasoning_llm_client
 import re
+import time
 import json
 import logging
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+RELATION_VERDICTS = ["DUPLICATE", "CONFLICT", "PARENT_OF", "CHILD_OF", "PARALLEL_TO"]
+
+# How a verdict reads when Q1 and Q2 are swapped
+INVERSE_VERDICTS = {"PARENT_OF": "CHILD_OF", "CHILD_OF": "PARENT_OF"}
+
 class DeduplicationService:
     _model = None
     
     def __init__(self, db: Session):
         self.db = db
-        # Lazy load model
+        # Lazy load model (shared with the embedding store)
         if DeduplicationService._model is None:
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            print(f"Loading SentenceTransformer model on {device}...")
-            DeduplicationService._model = SentenceTransformer("all-MiniLM-L6-v2", device=device)
+            DeduplicationService._model = EmbeddingStore.get_model()
         
         self.model = DeduplicationService._model
-        self.llm = ChatOpenAI(
-            temperature=0, # Low temperature for logical reasoning
-            model=settings.MODEL,
-            openai_api_key=settings.GROQ_API_KEY,
-            base_url="https://api.groq.com/openai/v1"
-        )
+        self.embeddings = EmbeddingStore(db, self.model)
+        self.llm = reasoning_llm_client  # Temperature 0, so verdicts are served from the LLM cache on repeats
 
     def normalize(self, text):
         return re.sub(r"[^\w\s%]", "", text.lower()).strip()
 
     def get_numbers(self, text):
-        return set(re.findall(r"\d+", text))
-
-    def check_layer2_ambiguity(self, q_new, q_match, vector_sim):
-        tfidf = TfidfVectorizer().fit_transform([q_new, q_match])
-        lexical_sim = (tfidf * tfidf.T).toarray()[0, 1]
-
-        nums_new = self.get_numbers(q_new)
-        nums_match = self.get_numbers(q_match)
+        return get_numbers(text)
 
+    def check_layer2_ambiguity(self, vector_sim, lexical_sim, nums_new, nums_match):
         # Higher similarity threshold for layer 2
         if (vector_sim > 0.85 and lexical_sim < 0.70) or nums_new != nums_match:
             return True
         return False
 
+    def get_pair_verdict(self, q1, q2):
+        """
+        Layer 3 with memoization: reuse a stored verdict for this pair of texts
+        (in either order) before asking the LLM
+        """
+        h1, h2 = text_hash(q1), text_hash(q2)
+        swapped = h1 > h2
+        hash_a, hash_b = (h2, h1) if swapped else (h1, h2)
+
+        # Verdicts are read and committed through their own short-lived sessions: the batch
+        # transaction stays open across every LLM call, and must not hold a write lock meanwhile
+        stored = self._stored_verdict(hash_a, hash_b)
+        cache_requests.inc(cache="pair_verdict", result="hit" if stored else "miss")
+        if stored:
+            verdict = INVERSE_VERDICTS.get(stored.verdict, stored.verdict) if swapped else stored.verdict
+            return {"verdict": verdict, "reason": stored.reason}
+
+        with dedupe_layer_seconds.time(layer="llm"):
+            verdict_data = self.call_agent_reasoning(q1, q2)
+        verdict = verdict_data.get("verdict")
+        if verdict in RELATION_VERDICTS or verdict == "UNIQUE":
+            with SessionLocal() as db:
+                try:
+                    db.add(PairVerdict(
+                        hash_a=hash_a,
+                        hash_b=hash_b,
+                        model_name=settings.MODEL,
+                        verdict=INVERSE_VERDICTS.get(verdict, verdict) if swapped else verdict,
+                        reason=verdict_data.get("reason", "")
+                    ))
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()
+                    # Another job stored this pair first; use its verdict so both agree
+                    stored = self._stored_verdict(hash_a, hash_b)
+                    if stored:
+                        verdict = INVERSE_VERDICTS.get(stored.verdict, stored.verdict) if swapped else stored.verdict
+                        return {"verdict": verdict, "reason": stored.reason}
+        return verdict_data
+
+    def _stored_verdict(self, hash_a: str, hash_b: str) -> PairVerdict | None:
+        with SessionLocal() as db:
+            return db.query(PairVerdict).filter(
+                PairVerdict.hash_a == hash_a,
+                PairVerdict.hash_b == hash_b,
+                PairVerdict.model_name == settings.MODEL
+            ).first()
+
     def call_agent_reasoning(self, q1, q2):
         prompt = f"""
         Compare these two questions for logical identity.
@@ -69,9 +114,8 @@ class DeduplicationService:
         """
         
         try:
-            response = self.llm.invoke(prompt)
+            content = self.llm.generate(prompt)
             # Try to extract JSON if it's wrapped in markers
-            content = response.content.strip()
             if "```json" in content:
                 content = content.split("```json")[1].split("```")[0].strip()
             elif "{" in content:
@@ -82,63 +126,186 @@ class DeduplicationService:
             logger.error(f"LLM reasoning failed: {e}")
             return {"verdict": "ERROR", "reason": str(e)}
 
+    def evaluate_pair(
+        self,
+        target_question: Question,
+        match_question: Question,
+        score_val: float,
+        lexical_sim: float,
+        numbers: dict
+    ):
+        """
+        Run Layer 2 (lexical/numeric) and, if ambiguous, Layer 3 (LLM) on a high-similarity pair
+
+        `lexical_sim` is precomputed for the whole batch; `numbers` maps question ids to
+        their numeric token sets.
+        """
+        from app.services.logger_service import log
+        # Per-pair messages are sampled; every message of a kept pair shares this key
+        pair_key = f"{target_question.id}:{match_question.id}"
+        log.info(
+            f"High similarity ({score_val*100:.0f}%) found with Question #{match_question.id}",
+            sample_key=pair_key, question_id=target_question.id, match_question_id=match_question.id
+        )
+        
+        # Layer 2: Lexical + Numeric check
+        ambiguous = self.check_layer2_ambiguity(
+            score_val,
+            lexical_sim,
+            numbers[target_question.id],
+            numbers[match_question.id]
+        )
+
+        if ambiguous:
+            log.process(
+                "Semantic match is high but text is different. Consulting AI Brain for a logical verdict...",
+                sample_key=pair_key
+            )
+            # Layer 3: LLM reasoning
+            verdict_data = self.get_pair_verdict(
+                target_question.question_text, 
+                match_question.question_text
+            )
+            log.ai(
+                f"AI Verdict: {verdict_data.get('verdict')} - {verdict_data.get('reason')}",
+                sample_key=pair_key, verdict=verdict_data.get("verdict")
+            )
+        else:
+            log.info("Direct Duplicate detected (High semantic and numeric match).", sample_key=pair_key)
+            verdict_data = {
+                "verdict": "DUPLICATE",
+                "reason": "High semantic and numeric match",
+            }
+        return verdict_data
+
     def check_question(self, target_question: Question, sim_threshold=0.85):
         """
         Check a single question against all approved/deduped questions in the DB
         """
+        return self.check_questions([target_question], sim_threshold)[target_question.id]
+
+    def check_questions(self, target_questions: list[Question], sim_threshold=0.85, on_progress=None):
+        """
+        Check a batch of questions against the bank and against each other.
+
+        All targets are encoded together and scored with one (batch x bank) search per
+        subject plus one (batch x batch) similarity matrix. Within the batch, a question
+        is compared with earlier (lower id) members that were not themselves flagged.
+        New embeddings are committed before the LLM layer; match rows are bulk
+        inserted and committed with the status changes at the end.
+
+        `on_progress(done, total, question)` is called after each question's verdict.
+
+        Returns:
+            Dict mapping each target question id to its list of matches
+        """
         from app.services.logger_service import log
-        log.process(f"Analyzing Question #{target_question.id}: '{target_question.question_text[:50]}...'")
+        if not target_questions:
+            return {}
 
-        # Get all existing questions that are NOT the current one and are APPROVED or DEDUPE_APPROVED
-        existing_questions = self.db.query(Question).filter(
-            Question.id != target_question.id,
-            Question.status.in_([QuestionStatus.APPROVED, QuestionStatus.DEDUPE_APPROVED])
-        ).all()
-        
-        if not existing_questions:
-            log.info("No existing questions found to compare against. Skipping.")
-            return []
+        targets = sorted(target_questions, key=lambda q: q.id)
+        batch_ids = {q.id for q in targets}
+        log.process(f"Analyzing {len(targets)} question(s) in one batch...")
 
-        q_texts = [q.question_text for q in existing_questions]
-        
-        # Semantic similarity
-        log.ai("Encoding question into mathematical vectors...")
-        new_emb = self.model.encode(target_question.question_text, convert_to_tensor=True)
-        ext_embs = self.model.encode(q_texts, convert_to_tensor=True)
-        scores = util.cos_sim(new_emb, ext_embs)[0]
-
-        matches_found = []
-
-        for i, score in enumerate(scores):
-            score_val = score.item()
-            if score_val >= sim_threshold:
-                match_question = existing_questions[i]
-                log.info(f"High similarity ({score_val*100:.0f}%) found with Question #{match_question.id}")
-                
-                # Layer 2: Lexical + Numeric check
-                ambiguous = self.check_layer2_ambiguity(
-                    target_question.question_text, 
-                    match_question.question_text, 
-                    score_val
-                )
+        # Nearest neighbours among APPROVED/DEDUPE_APPROVED questions of the same subject
+        vector_index.ensure_ready(self.db, self.embeddings)
+        log.ai("Encoding questions into mathematical vectors...")
+        with dedupe_layer_seconds.time(layer="embedding"):
+            vectors = self.embeddings.get_vectors(targets)
+        # Store new embeddings now rather than holding their write lock across the LLM calls;
+        # the commit expires the targets, so reload them in one query instead of one each
+        self.db.commit()
+        self.db.query(Question).filter(Question.id.in_(batch_ids)).all()
+        layer1_started = time.perf_counter()
 
-                if ambiguous:
-                    log.process("Semantic match is high but text is different. Consulting AI Brain for a logical verdict...")
-                    # Layer 3: LLM reasoning
-                    verdict_data = self.call_agent_reasoning(
-                        target_question.question_text, 
-                        match_question.question_text
-                    )
-                    log.ai(f"AI Verdict: {verdict_data.get('verdict')} - {verdict_data.get('reason')}")
-                else:
-                    log.info("Direct Duplicate detected (High semantic and numeric match).")
-                    verdict_data = {
-                        "verdict": "DUPLICATE",
-                        "reason": "High semantic and numeric match",
-                    }
+        bank_hits = {}
+        by_subject = {}
+        for row, q in enumerate(targets):
+            by_subject.setdefault(q.subject, []).append(row)
+        for subject, rows in by_subject.items():
+            subject_hits = vector_index.search(
+                subject,
+                vectors[rows],
+                k=settings.DEDUPE_TOP_K,
+                threshold=sim_threshold,
+                exclude_ids=batch_ids
+            )
+            for row, hits in zip(rows, subject_hits):
+                bank_hits[targets[row].id] = hits
+
+        # Questions submitted together are compared with each other as well
+        batch_sims = vectors @ vectors.T
+
+        hit_ids = {match_id for hits in bank_hits.values() for match_id, _ in hits}
+        match_questions = {
+            q.id: q for q in self.db.query(Question).filter(Question.id.in_(hit_ids)).all()
+        } if hit_ids else {}
+
+        # Candidate pairs: bank hits plus earlier batch members above the threshold
+        candidates = {}
+        for row, target_question in enumerate(targets):
+            candidates[target_question.id] = [
+                (match_questions[match_id], score_val)
+                for match_id, score_val in bank_hits[target_question.id]
+                if match_id in match_questions
+            ] + [
+                (targets[earlier], float(batch_sims[row, earlier]))
+                for earlier in range(row)
+                if targets[earlier].subject == target_question.subject
+                and batch_sims[row, earlier] >= sim_threshold
+            ]
+
+        dedupe_layer_seconds.observe(time.perf_counter() - layer1_started, layer="vector_search")
+
+        # Layer 2 inputs for every candidate pair, computed once for the whole batch
+        layer2_started = time.perf_counter()
+        lexical = {}
+        for subject in by_subject:
+            pairs = [
+                (target_question, match_question)
+                for target_question in targets if target_question.subject == subject
+                for match_question, _ in candidates[target_question.id]
+            ]
+            sims = vector_index.lexical_similarities(
+                subject,
+                [t.question_text for t, _ in pairs],
+                [m.question_text for _, m in pairs]
+            )
+            for (t, m), sim in zip(pairs, sims):
+                lexical[(t.id, m.id)] = float(sim)
+        numbers = {q.id: get_numbers(q.question_text) for q in targets}
+        numbers.update({q.id: get_numbers(q.question_text) for q in match_questions.values()})
+        dedupe_layer_seconds.observe(time.perf_counter() - layer2_started, layer="lexical")
+
+        results = {}
+        match_rows = []
+        unique_ids = set()
+        for target_question in targets:
+            log.process(
+                f"Analyzing Question #{target_question.id}: '{target_question.question_text[:50]}...'",
+                question_id=target_question.id
+            )
+            # Batch members only count as matches if they passed themselves
+            target_candidates = [
+                (match_question, score_val)
+                for match_question, score_val in candidates[target_question.id]
+                if match_question.id not in batch_ids or match_question.id in unique_ids
+            ]
+            if not target_candidates:
+                log.info("No similar questions found in the bank.", question_id=target_question.id)
+
+            matches_found = []
+            for match_question, score_val in target_candidates:
+                verdict_data = self.evaluate_pair(
+                    target_question,
+                    match_question,
+                    score_val,
+                    lexical[(target_question.id, match_question.id)],
+                    numbers
+                )
 
                 # Save match if it's flagged as DUPLICATE, CONFLICT, or any RELATION
-                if verdict_data["verdict"] in ["DUPLICATE", "CONFLICT", "PARENT_OF", "CHILD_OF", "PARALLEL_TO"]:
+                if verdict_data["verdict"] in RELATION_VERDICTS:
                     match_data = {
                         "match_question_id": match_question.id,
                         "match_question_text": match_question.question_text,
@@ -146,25 +313,30 @@ class DeduplicationService:
                         "verdict": verdict_data["verdict"],
                         "reason": verdict_data.get("reason", "")
                     }
-                    
-                    # If we want to persist immediately (for history/reporting)
-                    match_record = DuplicateMatch(
-                        question_id=target_question.id,
-                        match_question_id=match_question.id,
-                        similarity_score=match_data["similarity_score"],
-                        verdict=match_data["verdict"],
-                        reason=match_data["reason"]
-                    )
-                    self.db.add(match_record)
+                    match_rows.append({
+                        "question_id": target_question.id,
+                        "match_question_id": match_question.id,
+                        "similarity_score": match_data["similarity_score"],
+                        "verdict": match_data["verdict"],
+                        "reason": match_data["reason"]
+                    })
                     matches_found.append(match_data)
 
-        # Automatic status update based on finding matches
-        if matches_found:
-            log.error(f"Flagging Question #{target_question.id} as a DUPLICATE.")
-            target_question.status = QuestionStatus.DUPLICATE_FLAGGED
-        else:
-            log.success(f"Question #{target_question.id} is UNIQUE. Moving to approval.")
-            target_question.status = QuestionStatus.DEDUPE_APPROVED
-            
+            # Automatic status update based on finding matches
+            if matches_found:
+                log.error(f"Flagging Question #{target_question.id} as a DUPLICATE.", question_id=target_question.id)
+                target_question.status = QuestionStatus.DUPLICATE_FLAGGED
+            else:
+                log.success(f"Question #{target_question.id} is UNIQUE. Moving to approval.", question_id=target_question.id)
+                target_question.status = QuestionStatus.DEDUPE_APPROVED
+                unique_ids.add(target_question.id)
+            results[target_question.id] = matches_found
+            dedupe_questions.inc(verdict=target_question.status.value)
+            if on_progress:
+                on_progress(len(results), len(targets), target_question)
+
+        if match_rows:
+            self.db.bulk_insert_mappings(DuplicateMatch, match_rows)
+        vector_index.sync(self.embeddings, targets)
         self.db.commit()
-        return matches_found
+        return results
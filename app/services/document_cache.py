@@ -0,0 +1,100 @@
+import logging
+import sqlite3
+import threading
+import time
+from app.core.metrics import cache_requests
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for another process's write lock before giving up on the cache
+BUSY_TIMEOUT = 2.0
+
+
+class DocumentCache:
+    """
+    Byte-bounded cache of results derived from uploaded documents (extracted
+    text, chunks, embeddings), backed by a local SQLite file.
+
+    Keys start with the document's sha256 so identical uploads share entries.
+    Once the stored values exceed `max_bytes`, least recently used entries are
+    evicted down to 90% of the limit.
+
+    SQLite errors (e.g. "database is locked" under contention) are logged and
+    treated as a miss or a skipped write, so the cache never fails a request.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS document_results (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_document_results_last_used ON document_results (last_used)")
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM document_results").fetchone()[0]
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            try:
+                row = self._conn.execute("SELECT value FROM document_results WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Document cache read failed, skipping cache: {e}")
+                row = None
+            if row is None:
+                self.misses += 1
+                cache_requests.inc(cache="document", result="miss")
+                return None
+            try:
+                self._conn.execute("UPDATE document_results SET last_used = ? WHERE key = ?", (time.time(), key))
+            except sqlite3.Error as e:
+                # Only the LRU order suffers
+                logger.warning(f"Document cache last_used update failed: {e}")
+            self.hits += 1
+            cache_requests.inc(cache="document", result="hit")
+            return row[0]
+
+    def set(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            try:
+                previous = self._conn.execute("SELECT size FROM document_results WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO document_results (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, value, len(value), time.time())
+                )
+                self._total += len(value) - (previous[0] if previous else 0)
+                if self._total > self.max_bytes:
+                    self._evict()
+            except sqlite3.Error as e:
+                logger.warning(f"Document cache write failed, result not cached: {e}")
+
+    def get_text(self, key: str) -> str | None:
+        value = self.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set_text(self, key: str, text: str):
+        self.set(key, text.encode("utf-8"))
+
+    def _evict(self):
+        """Drop least recently used entries until 10% below the byte limit"""
+        target = int(self.max_bytes * 0.9)
+        total = self._total
+        evicted = []
+        rows = self._conn.execute("SELECT key, size FROM document_results ORDER BY last_used").fetchall()
+        for key, size in rows:
+            if total <= target:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM document_results WHERE key = ?", evicted)
+        self._total = total
+        logger.info(f"Document cache evicted {len(evicted)} entries, {total} bytes remain")
@@ -0,0 +1,163 @@
+"""
+Shared embedding service: one process holds the SentenceTransformer and
+serves encode requests from every API worker over a Unix socket.
+
+Run it next to the API and point the workers at it, with the same secret:
+
+    EMBEDDING_SERVICE_SOCKET=/run/qb/embeddings.sock EMBEDDING_SERVICE_AUTHKEY=... python -m app.services.embedding_service
+
+Messages are JSON requests and raw float32 replies, never pickles, so neither
+side can be made to run code by the other. The socket is created owner-only.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Callable, List
+import numpy as np
+from app.core.config import get_settings
+from app.services.encode_batcher import EncodeBatcher
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Largest message either side accepts
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+class EmbeddingServiceError(Exception):
+    """The service was reached but could not encode the request"""
+
+
+class RemoteEncoder:
+    """
+    Client for the embedding service, usable wherever a SentenceTransformer is.
+
+    Each thread keeps its own connection. If the service cannot be reached the
+    call falls back to a local model (loaded once, on first need) and the
+    service is retried after EMBEDDING_SERVICE_RETRY_SECONDS. A request the
+    service fails to encode falls back on its own.
+    """
+
+    def __init__(self, address: str, load_fallback: Callable):
+        self.address = address
+        self._load_fallback = load_fallback
+        self._fallback = None
+        self._fallback_lock = threading.Lock()
+        self._local = threading.local()
+        self._retry_at = 0.0
+
+    def encode(self, texts: str | List[str], convert_to_numpy: bool = True, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            return self.encode([texts], convert_to_numpy, normalize_embeddings, **kwargs)[0]
+        texts = list(texts)
+        if time.monotonic() >= self._retry_at:
+            try:
+                return self._remote_encode(texts, normalize_embeddings)
+            except (OSError, EOFError, ValueError, KeyError, AuthenticationError) as e:
+                self._drop_connection()
+                self._retry_at = time.monotonic() + settings.EMBEDDING_SERVICE_RETRY_SECONDS
+                logger.warning(f"Embedding service at {self.address} unavailable ({e}), encoding in-process")
+            except EmbeddingServiceError as e:
+                # The connection is still in step, so only this call falls back
+                logger.warning(f"Embedding service at {self.address} failed ({e}), encoding in-process")
+        return self._fallback_model().encode(
+            texts, convert_to_numpy=convert_to_numpy, normalize_embeddings=normalize_embeddings, **kwargs
+        )
+
+    def _remote_encode(self, texts: List[str], normalize_embeddings: bool) -> np.ndarray:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, family="AF_UNIX", authkey=settings.EMBEDDING_SERVICE_AUTHKEY.encode())
+            self._local.conn = conn
+        conn.send_bytes(json.dumps({"texts": texts, "normalize": normalize_embeddings}).encode("utf-8"))
+        reply = json.loads(self._receive(conn))
+        if "error" in reply:
+            raise EmbeddingServiceError(reply["error"])
+        rows, dim = reply["shape"]
+        return np.frombuffer(self._receive(conn), dtype=np.float32).reshape(rows, dim)
+
+    @staticmethod
+    def _receive(conn) -> bytes:
+        # A stalled service must not hang the worker; TimeoutError triggers the local fallback
+        if not conn.poll(settings.EMBEDDING_SERVICE_TIMEOUT_SECONDS):
+            raise TimeoutError(f"No reply within {settings.EMBEDDING_SERVICE_TIMEOUT_SECONDS}s")
+        return conn.recv_bytes(MAX_MESSAGE_BYTES)
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _fallback_model(self):
+        if self._fallback is None:
+            with self._fallback_lock:
+                if self._fallback is None:
+                    self._fallback = self._load_fallback()
+        return self._fallback
+
+
+def _handle_connection(conn, batcher: EncodeBatcher):
+    with conn:
+        while True:
+            try:
+                message = conn.recv_bytes(MAX_MESSAGE_BYTES)
+            except (EOFError, OSError):
+                return
+            try:
+                request = json.loads(message)
+                texts = request["texts"]
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    raise ValueError("texts must be a list of strings")
+                vectors = np.ascontiguousarray(
+                    batcher.encode(texts, normalize_embeddings=bool(request.get("normalize"))), dtype=np.float32
+                ).reshape(len(texts), -1)
+            except Exception as e:
+                conn.send_bytes(json.dumps({"error": f"Encoding failed: {e}"}).encode("utf-8"))
+                continue
+            conn.send_bytes(json.dumps({"shape": list(vectors.shape)}).encode("utf-8"))
+            conn.send_bytes(vectors.tobytes())
+
+
+def serve(address: str, model):
+    """Accept worker connections forever; requests from all of them share one EncodeBatcher"""
+    if os.path.exists(address):
+        os.remove(address)
+    batcher = EncodeBatcher(model, settings.EMBEDDING_BATCH_MAX_SIZE, settings.EMBEDDING_BATCH_WAIT_MS)
+    # Owner-only from the moment the socket exists, so other local users cannot connect
+    previous_umask = os.umask(0o177)
+    try:
+        listener = Listener(address, family="AF_UNIX", authkey=settings.EMBEDDING_SERVICE_AUTHKEY.encode())
+    finally:
+        os.umask(previous_umask)
+    os.chmod(address, 0o600)
+    with listener:
+        logger.info(f"Embedding service listening on {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # A client that fails authentication must not take the service down
+                logger.warning(f"Rejected embedding service connection: {e}")
+                continue
+            threading.Thread(target=_handle_connection, args=(conn, batcher), daemon=True).start()
+
+
+def main():
+    from app.services.embedding_store import EmbeddingStore
+    from app.services.logger_service import setup_logging
+    setup_logging()
+    if not settings.EMBEDDING_SERVICE_SOCKET:
+        raise SystemExit("Set EMBEDDING_SERVICE_SOCKET to the Unix socket path to listen on")
+    serve(settings.EMBEDDING_SERVICE_SOCKET, EmbeddingStore.load_local_model())
+
+
+if __name__ == "__main__":
+    main()
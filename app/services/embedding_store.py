@@ -0,0 +1,171 @@
+import hashlib
+import logging
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.core.metrics import cache_requests, embedding_encode_seconds
+from app.models.database import Question, QuestionEmbedding
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Keep IN (...) lists well below the SQLite bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+def text_hash(text: str) -> str:
+    """Stable content hash used to detect edited question text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Persistent embedding cache for questions.
+
+    Vectors are stored normalized as float32 blobs keyed by question id, together
+    with a hash of the text they were computed from. Rows whose hash or model no
+    longer match are treated as stale and re-encoded on the next read.
+    """
+    _model = None
+
+    def __init__(self, db: Session, model=None):
+        self.db = db
+        self.model = model or EmbeddingStore.get_model()
+
+    @classmethod
+    def get_model(cls):
+        """
+        The encoder for this process: a client for the shared embedding service when
+        EMBEDDING_SERVICE_SOCKET is set, otherwise the SentenceTransformer loaded once
+        behind an EncodeBatcher
+        """
+        if cls._model is None:
+            if settings.EMBEDDING_SERVICE_SOCKET:
+                from app.services.embedding_service import RemoteEncoder
+                cls._model = RemoteEncoder(settings.EMBEDDING_SERVICE_SOCKET, load_fallback=cls.load_batched_model)
+            else:
+                cls._model = cls.load_batched_model()
+        return cls._model
+
+    @classmethod
+    def load_batched_model(cls):
+        model = cls.load_local_model()
+        if not settings.EMBEDDING_BATCHING_ENABLED:
+            return model
+        from app.services.encode_batcher import EncodeBatcher
+        return EncodeBatcher(model, settings.EMBEDDING_BATCH_MAX_SIZE, settings.EMBEDDING_BATCH_WAIT_MS)
+
+    @staticmethod
+    def load_local_model():
+        import torch
+        from sentence_transformers import SentenceTransformer
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        logger.info(f"Loading SentenceTransformer model on {device}...")
+        return SentenceTransformer(EMBEDDING_MODEL_NAME, device=device)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode raw texts into an (n, dim) matrix of normalized float32 vectors"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        with embedding_encode_seconds.time(caller="questions"):
+            vectors = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def is_fresh(self, question: Question, record: Optional[QuestionEmbedding]) -> bool:
+        return (
+            record is not None
+            and record.model_name == EMBEDDING_MODEL_NAME
+            and record.text_hash == text_hash(question.question_text)
+        )
+
+    def load_records(self, question_ids: List[int]) -> Dict[int, QuestionEmbedding]:
+        """Fetch stored embedding rows for the given question ids"""
+        records = {}
+        for start in range(0, len(question_ids), LOOKUP_CHUNK_SIZE):
+            chunk = question_ids[start:start + LOOKUP_CHUNK_SIZE]
+            for record in self.db.query(QuestionEmbedding).filter(QuestionEmbedding.question_id.in_(chunk)):
+                records[record.question_id] = record
+        return records
+
+    def get_vectors(
+        self,
+        questions: List[Question],
+        records: Optional[Dict[int, QuestionEmbedding]] = None
+    ) -> np.ndarray:
+        """
+        Return an (n, dim) matrix aligned with `questions`.
+
+        Only questions without a fresh stored vector are encoded; their new vectors
+        are written back to the session (the caller owns the commit).
+
+        Args:
+            questions: Questions to fetch vectors for
+            records: Pre-loaded embedding rows keyed by question id (optional)
+        """
+        if not questions:
+            return np.zeros((0, 0), dtype=np.float32)
+        if records is None:
+            records = self.load_records([q.id for q in questions])
+
+        stale = [q for q in questions if not self.is_fresh(q, records.get(q.id))]
+        cache_requests.inc(len(questions) - len(stale), cache="question_embedding", result="hit")
+        cache_requests.inc(len(stale), cache="question_embedding", result="miss")
+        if stale:
+            logger.info(f"Encoding {len(stale)} of {len(questions)} questions (missing or stale embeddings)")
+            fresh_vectors = self.encode([q.question_text for q in stale])
+            for question, vector in zip(stale, fresh_vectors):
+                records[question.id] = self._upsert(question, vector, records.get(question.id))
+            # Flush so later lookups in this transaction see the new rows
+            self.db.flush()
+
+        return np.stack([
+            np.frombuffer(records[q.id].vector, dtype=np.float32)
+            for q in questions
+        ])
+
+    def _upsert(
+        self,
+        question: Question,
+        vector: np.ndarray,
+        record: Optional[QuestionEmbedding]
+    ) -> QuestionEmbedding:
+        if record is None:
+            try:
+                # Savepoint, so losing the race below does not abort the caller's transaction
+                with self.db.begin_nested():
+                    record = self._fill(QuestionEmbedding(question_id=question.id), question, vector)
+                    self.db.add(record)
+                return record
+            except IntegrityError:
+                # The background embed task or another dedupe run stored this question first;
+                # lock its row (a current read, whatever the isolation level) and overwrite it
+                record = self.db.get(QuestionEmbedding, question.id, with_for_update=True)
+        return self._fill(record, question, vector)
+
+    @staticmethod
+    def _fill(record: QuestionEmbedding, question: Question, vector: np.ndarray) -> QuestionEmbedding:
+        record.model_name = EMBEDDING_MODEL_NAME
+        record.text_hash = text_hash(question.question_text)
+        record.dim = int(vector.shape[0])
+        record.vector = np.asarray(vector, dtype=np.float32).tobytes()
+        return record
+
+
+def run_bg_embed(question_ids: List[int]):
+    """Background task to precompute embeddings for newly created or edited questions"""
+    db = SessionLocal()
+    try:
+        questions = db.query(Question).filter(Question.id.in_(question_ids)).all()
+        if questions:
+            EmbeddingStore(db).get_vectors(questions)
+            db.commit()
+    except Exception as e:
+        logger.error(f"Background embedding failed: {e}")
+        db.rollback()
+    finally:
+        db.close()
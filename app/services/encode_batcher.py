@@ -0,0 +1,95 @@
+import queue
+import threading
+import time
+from typing import List
+import numpy as np
+from app.core.metrics import embedding_batch_sentences
+
+
+class _EncodeRequest:
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result: np.ndarray | None = None
+        self.error: Exception | None = None
+
+
+class EncodeBatcher:
+    """
+    Coalesces concurrent encode calls into batched `model.encode` calls.
+
+    Callers block in encode(); a single background thread takes the first
+    waiting request, keeps collecting until `max_batch_size` sentences or
+    `max_wait_ms` have passed, encodes everything at once and hands each caller
+    its own rows. Exposes the same encode() signature as SentenceTransformer.
+    """
+
+    def __init__(self, model, max_batch_size: int, max_wait_ms: float):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue[_EncodeRequest] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def encode(self, texts: str | List[str], convert_to_numpy: bool = True, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        # Like SentenceTransformer, a single string gives a single 1-D vector
+        if isinstance(texts, str):
+            return self.encode([texts], normalize_embeddings=normalize_embeddings)[0]
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        self._ensure_thread()
+        request = _EncodeRequest(texts)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        vectors = request.result
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0].texts)
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+            self._encode_batch(batch)
+
+    def _encode_batch(self, batch: List[_EncodeRequest]):
+        embedding_batch_sentences.observe(sum(len(request.texts) for request in batch))
+        try:
+            # Normalization is per caller, so the shared call returns raw vectors
+            vectors = np.asarray(
+                self.model.encode([text for request in batch for text in request.texts], convert_to_numpy=True),
+                dtype=np.float32
+            )
+            offset = 0
+            for request in batch:
+                request.result = vectors[offset:offset + len(request.texts)]
+                offset += len(request.texts)
+        except Exception as e:
+            for request in batch:
+                request.error = e
+        finally:
+            for request in batch:
+                request.done.set()
@@ -0,0 +1,81 @@
+import re
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+N_FEATURES = 2 ** 18
+
+NUMBER_PATTERN = re.compile(r"\d+")
+
+
+def get_numbers(text: str) -> frozenset:
+    """Numeric tokens of a question (e.g. marks, sizes, years) for the Layer-2 check"""
+    return frozenset(NUMBER_PATTERN.findall(text))
+
+
+class LexicalIndex:
+    """
+    Per-subject TF-IDF statistics for the Layer-2 lexical check.
+
+    Terms are hashed (no vocabulary to refit) and document frequencies are kept
+    per subject, updated incrementally as questions enter or leave the bank.
+    IDF uses the same smoothed formula as sklearn's TfidfVectorizer, but over the
+    whole subject instead of just the two questions being compared.
+    """
+
+    def __init__(self, n_features: int = N_FEATURES):
+        self.n_features = n_features
+        self._vectorizer = None
+        self.doc_freq: Dict[str, np.ndarray] = {}
+        self.doc_count: Dict[str, int] = {}
+        self.terms: Dict[int, Tuple[str, np.ndarray]] = {}
+
+    @property
+    def vectorizer(self):
+        # sklearn is imported on first use to keep it out of application startup
+        if self._vectorizer is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+            # Same tokenization as TfidfVectorizer; raw counts, weighting applied at query time
+            self._vectorizer = HashingVectorizer(n_features=self.n_features, alternate_sign=False, norm=None)
+        return self._vectorizer
+
+    def load(self):
+        """Import sklearn and build the vectorizer now instead of on first use"""
+        return self.vectorizer
+
+    def add(self, subject: str, ids: List[int], texts: List[str]):
+        if not ids:
+            return
+        self.remove([qid for qid in ids if qid in self.terms])
+        counts = self.vectorizer.transform(texts)
+        doc_freq = self.doc_freq.setdefault(subject, np.zeros(self.n_features, dtype=np.int32))
+        for row, qid in enumerate(ids):
+            term_ids = counts.indices[counts.indptr[row]:counts.indptr[row + 1]].copy()
+            doc_freq[term_ids] += 1
+            self.terms[qid] = (subject, term_ids)
+        self.doc_count[subject] = self.doc_count.get(subject, 0) + len(ids)
+
+    def remove(self, ids: Iterable[int]):
+        for qid in ids:
+            entry = self.terms.pop(qid, None)
+            if entry is not None:
+                subject, term_ids = entry
+                self.doc_freq[subject][term_ids] -= 1
+                self.doc_count[subject] -= 1
+
+    def idf(self, subject: str) -> np.ndarray:
+        n_docs = self.doc_count.get(subject, 0)
+        doc_freq = self.doc_freq.get(subject)
+        if doc_freq is None:
+            doc_freq = np.zeros(self.n_features, dtype=np.int32)
+        return np.log((1 + n_docs) / (1 + doc_freq)) + 1
+
+    def pair_similarities(self, subject: str, texts_a: List[str], texts_b: List[str]) -> np.ndarray:
+        """Cosine similarity of TF-IDF vectors for each aligned pair (texts_a[i], texts_b[i])"""
+        if not texts_a:
+            return np.zeros(0)
+        from scipy import sparse
+        from sklearn.preprocessing import normalize
+        weights = sparse.diags(self.idf(subject))
+        tfidf_a = normalize(self.vectorizer.transform(texts_a) @ weights)
+        tfidf_b = normalize(self.vectorizer.transform(texts_b) @ weights)
+        return np.asarray(tfidf_a.multiply(tfidf_b).sum(axis=1)).ravel()
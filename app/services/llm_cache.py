@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from app.core.metrics import cache_requests
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for another process's write lock before giving up on the cache
+BUSY_TIMEOUT = 2.0
+
+
+class LLMCache:
+    """
+    Content-addressed cache of LLM responses backed by a local SQLite file.
+
+    Entries are keyed by (model, temperature, sha256(prompt)), expire after
+    `ttl_seconds` and are evicted least-recently-used once the cache holds more
+    than `max_entries` rows. The file survives restarts and is shared by all
+    worker processes on the host.
+
+    SQLite errors (e.g. "database is locked" under contention) are logged and
+    treated as a miss or a skipped write, so the cache never fails a generation.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used ON llm_responses (last_used)")
+        self._size = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{model}:{temperature}:{prompt_hash}"
+
+    def get(self, model: str, temperature: float, prompt: str) -> str | None:
+        key = self.make_key(model, temperature, prompt)
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache read failed, skipping cache: {e}")
+                row = None
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                cache_requests.inc(cache="llm", result="miss")
+                return None
+            try:
+                self._conn.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (now, key))
+            except sqlite3.Error as e:
+                # Only the LRU order suffers
+                logger.warning(f"LLM cache last_used update failed: {e}")
+            self.hits += 1
+            cache_requests.inc(cache="llm", result="hit")
+            return row[0]
+
+    def set(self, model: str, temperature: float, prompt: str, response: str):
+        key = self.make_key(model, temperature, prompt)
+        now = time.time()
+        with self._lock:
+            try:
+                previous = self._conn.execute("SELECT 1 FROM llm_responses WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                if previous is None:
+                    self._size += 1
+                if self._size > self.max_entries:
+                    self._evict(now)
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache write failed, response not cached: {e}")
+
+    def _evict(self, now: float):
+        """Drop expired rows, then least recently used rows until 10% below the limit"""
+        self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        size = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        target = int(self.max_entries * 0.9)
+        if size > target:
+            self._conn.execute(
+                "DELETE FROM llm_responses WHERE key IN "
+                "(SELECT key FROM llm_responses ORDER BY last_used LIMIT ?)",
+                (size - target,)
+            )
+            size = target
+        self._size = size
+        logger.info(f"LLM cache evicted down to {size} entries")
@@ -1,28 +1,125 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
+import asyncio
+import time
+import weakref
 from app.core.config import get_settings
+from app.core.metrics import llm_request_seconds, llm_tokens
+from app.services.llm_cache import LLMCache
 
 settings = get_settings()
 
+# Shared on-disk response cache (only deterministic calls are cached, see LLMClient.cacheable)
+llm_cache = LLMCache(
+    path=settings.LLM_CACHE_PATH,
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+) if settings.LLM_CACHE_ENABLED else None
+
 
 class LLMClient:
     """Client for interacting with Groq LLM"""
-    
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            temperature=0.7,  # Slightly higher for creative question generation
-            model=settings.MODEL,
-            openai_api_key=settings.GROQ_API_KEY,
-            base_url="https://api.groq.com/openai/v1",
-            tiktoken_model_name="gpt-3.5-turbo"
-        )
-    
+
+    def __init__(self, temperature: float = 0.7):
+        self.temperature = temperature
+        self._llm = None
+        # One concurrency limiter per event loop (asyncio primitives are loop-bound)
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def llm(self):
+        """The ChatOpenAI client, built (and langchain imported) on first use"""
+        if self._llm is None:
+            from langchain_openai import ChatOpenAI
+            self._llm = ChatOpenAI(
+                temperature=self.temperature,
+                model=settings.MODEL,
+                openai_api_key=settings.GROQ_API_KEY,
+                base_url="https://api.groq.com/openai/v1",
+                tiktoken_model_name="gpt-3.5-turbo"
+            )
+        return self._llm
+
+    def load(self):
+        """Build the client now instead of on the first request"""
+        return self.llm
+
+    @property
+    def cacheable(self) -> bool:
+        # Sampling at higher temperatures is meant to vary, so those calls are never cached
+        return llm_cache is not None and self.temperature <= settings.LLM_CACHE_MAX_TEMPERATURE
+
     def generate(self, prompt: str) -> str:
         """Generate text using the LLM"""
+        if self.cacheable:
+            cached = llm_cache.get(settings.MODEL, self.temperature, prompt)
+            if cached is not None:
+                return cached
+        
+        from langchain_core.messages import HumanMessage
         messages = [HumanMessage(content=prompt)]
-        response = self.llm.invoke(messages)
-        return response.content.strip()
+        started = time.perf_counter()
+        try:
+            response = self.llm.invoke(messages)
+        except Exception:
+            llm_request_seconds.observe(time.perf_counter() - started, mode="sync", outcome="error")
+            raise
+        llm_request_seconds.observe(time.perf_counter() - started, mode="sync", outcome="ok")
+        self._count_tokens(response)
+        content = response.content.strip()
+        
+        if self.cacheable:
+            llm_cache.set(settings.MODEL, self.temperature, prompt, content)
+        return content
+
+    async def agenerate(self, prompt: str) -> str:
+        """
+        Generate text without blocking the event loop
+
+        At most LLM_MAX_CONCURRENCY calls run at once; each call is cancelled
+        with asyncio.TimeoutError after LLM_REQUEST_TIMEOUT seconds.
+        """
+        if self.cacheable:
+            cached = llm_cache.get(settings.MODEL, self.temperature, prompt)
+            if cached is not None:
+                return cached
+        
+        from langchain_core.messages import HumanMessage
+        messages = [HumanMessage(content=prompt)]
+        async with self._semaphore():
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    self.llm.ainvoke(messages),
+                    timeout=settings.LLM_REQUEST_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                llm_request_seconds.observe(time.perf_counter() - started, mode="async", outcome="timeout")
+                raise
+            except Exception:
+                llm_request_seconds.observe(time.perf_counter() - started, mode="async", outcome="error")
+                raise
+            llm_request_seconds.observe(time.perf_counter() - started, mode="async", outcome="ok")
+        self._count_tokens(response)
+        content = response.content.strip()
+        
+        if self.cacheable:
+            llm_cache.set(settings.MODEL, self.temperature, prompt, content)
+        return content
+
+    @staticmethod
+    def _count_tokens(response):
+        usage = getattr(response, "usage_metadata", None) or {}
+        llm_tokens.inc(usage.get("input_tokens", 0), type="input")
+        llm_tokens.inc(usage.get("output_tokens", 0), type="output")
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+            self._semaphores[loop] = semaphore
+        return semaphore
 
 
-# Singleton instance
-llm_client = LLMClient()
+# Singleton instances
+llm_client = LLMClient()  # Slightly higher temperature for creative question generation
+reasoning_llm_client = LLMClient(temperature=0)  # Low temperature for logical reasoning
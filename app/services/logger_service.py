@@ -1,6 +1,75 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
 import sys
+import uuid
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from app.core.config import get_settings
+from app.core.metrics import log_records_dropped
 
-class Logger:
+settings = get_settings()
+
+# Id of the request or background job the current code runs for
+correlation_id: contextvars.ContextVar[str | None] = contextvars.ContextVar("correlation_id", default=None)
+
+
+def new_correlation_id(prefix: str = "") -> str:
+    return prefix + uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def correlation_scope(cid: str | None = None):
+    """Tag every log record emitted inside the block (and tasks/threads started from it) with `cid`"""
+    cid = cid or new_correlation_id()
+    token = correlation_id.set(cid)
+    try:
+        yield cid
+    finally:
+        correlation_id.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Adds correlation_id/kind to records and applies sampling to high-volume messages"""
+
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.sample_threshold = int(sample_rate * 10000)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = getattr(record, "correlation_id", None) or correlation_id.get()
+        record.kind = getattr(record, "kind", None) or record.levelname.lower()
+        sample_key = getattr(record, "sample_key", None)
+        if sample_key is not None and record.levelno < logging.WARNING:
+            # Keyed, not random: all messages about one question pair are kept or dropped together
+            return zlib.crc32(sample_key.encode("utf-8")) % 10000 < self.sample_threshold
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "kind": getattr(record, "kind", None),
+            "msg": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", None)
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """The original coloured, emoji-tagged console format"""
     # ANSI escape codes for colors
     BLUE = "\033[94m"
     GREEN = "\033[92m"
@@ -9,25 +78,108 @@ class Logger:
     BOLD = "\033[1m"
     END = "\033[0m"
 
+    STYLES = {
+        "info": (BLUE, "[INFO] 📝 "),
+        "success": (GREEN, "[SUCCESS] ✅ "),
+        "process": (YELLOW, "[PROCESS] ⚙️ "),
+        "warning": (YELLOW, "[WARNING] ⚠️ "),
+        "error": (RED + BOLD, "[ERROR] ❌ "),
+        "ai": (BOLD, "🤖 [AI BRAIN] "),
+    }
+
+    def format(self, record: logging.LogRecord) -> str:
+        color, tag = self.STYLES.get(getattr(record, "kind", None), ("", f"[{record.levelname}] "))
+        message = record.getMessage()
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+        return f"{color}{tag}{message}{self.END if color else ''}"
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: when the queue is full the record is dropped and counted"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            log_records_dropped.inc()
+
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def setup_logging():
+    """
+    Route all logging through a bounded queue drained by a background thread
+
+    Writes JSON lines to stdout (LOG_FORMAT=console for the coloured format).
+    Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(ConsoleFormatter() if settings.LOG_FORMAT == "console" else JSONFormatter())
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(ContextFilter(settings.LOG_PAIR_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+class Logger:
+    """
+    Dedupe progress logger (`log.info`, `log.success`, `log.process`, `log.error`, `log.ai`)
+
+    Extra keyword arguments become fields of the JSON record. Pass `sample_key`
+    for high-volume per-pair messages so only LOG_PAIR_SAMPLE_RATE of them are kept.
+    """
+    _logger = logging.getLogger("qb.dedupe")
+
+    @staticmethod
+    def _log(level: int, kind: str, msg, sample_key: str | None = None, **fields):
+        setup_logging()
+        Logger._logger.log(level, msg, extra={"kind": kind, "sample_key": sample_key, "fields": fields})
+
+    @staticmethod
+    def debug(msg, **kwargs):
+        Logger._log(logging.DEBUG, "debug", msg, **kwargs)
+
+    @staticmethod
+    def info(msg, **kwargs):
+        Logger._log(logging.INFO, "info", msg, **kwargs)
+
     @staticmethod
-    def info(msg):
-        print(f"{Logger.BLUE}[INFO] 📝 {msg}{Logger.END}")
+    def success(msg, **kwargs):
+        Logger._log(logging.INFO, "success", msg, **kwargs)
 
     @staticmethod
-    def success(msg):
-        print(f"{Logger.GREEN}[SUCCESS] ✅ {msg}{Logger.END}")
+    def process(msg, **kwargs):
+        Logger._log(logging.INFO, "process", msg, **kwargs)
 
     @staticmethod
-    def process(msg):
-        print(f"{Logger.YELLOW}[PROCESS] ⚙️ {msg}{Logger.END}")
+    def warning(msg, **kwargs):
+        Logger._log(logging.WARNING, "warning", msg, **kwargs)
 
     @staticmethod
-    def error(msg):
-        print(f"{Logger.RED}{Logger.BOLD}[ERROR] ❌ {msg}{Logger.END}")
+    def error(msg, **kwargs):
+        Logger._log(logging.ERROR, "error", msg, **kwargs)
 
     @staticmethod
-    def ai(msg):
-        print(f"{Logger.BOLD}🤖 [AI BRAIN] {msg}{Logger.END}")
+    def ai(msg, **kwargs):
+        Logger._log(logging.INFO, "ai", msg, **kwargs)
 
 # Global layman logger
 log = Logger
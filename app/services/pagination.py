@@ -0,0 +1,55 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Query
+from app.models.database import Question
+
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(question: Question) -> str:
+    """Opaque cursor pointing just after `question` in (created_at, id) DESC order"""
+    payload = json.dumps([question.created_at.isoformat(), question.id])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor
+    """
+    try:
+        created_at, question_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(question_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def paginate_questions(query: Query, limit: int, cursor: str | None = None) -> tuple[list[Question], str | None]:
+    """
+    Keyset-paginate a Question query, newest first
+
+    Returns:
+        Tuple of (questions on this page, cursor for the next page or None)
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        created_at, question_id = decode_cursor(cursor)
+        # Compare against the anchor row's stored value so the DB's own timestamp format is
+        # used (SQLite keeps CURRENT_TIMESTAMP without microseconds); fall back to the
+        # cursor's copy if that row has since been deleted
+        anchor = func.coalesce(
+            select(Question.created_at).where(Question.id == question_id).scalar_subquery(),
+            created_at
+        )
+        query = query.filter(or_(
+            Question.created_at < anchor,
+            and_(Question.created_at == anchor, Question.id < question_id)
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(Question.created_at.desc(), Question.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
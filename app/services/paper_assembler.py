@@ -0,0 +1,497 @@
+import logging
+import time
+import numpy as np
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, selectinload
+from app.models.database import BloomLevel, Difficulty, Question, question_course_outcomes
+from app.models.schemas import ExamVariantsRequest, ExamVariantsResponse, PaperAssembleRequest, PaperResponse
+from app.services.question_writer import to_question_response
+
+logger = logging.getLogger(__name__)
+
+BLOOM_LEVELS = [level.value for level in BloomLevel]
+DIFFICULTIES = [difficulty.value for difficulty in Difficulty]
+
+# Greedy score weights: covering a missing course outcome beats filling a Bloom
+# quota, which beats keeping the running marks on target
+CO_WEIGHT = 3.0
+BLOOM_WEIGHT = 4.0
+MARKS_WEIGHT = 1.0
+REPAIR_SWEEPS = 5
+PAIR_REPAIR_MAX_TRIES = 50  # Pairs fully tried per paper; each try costs a pass over the pool
+FEASIBILITY_WEIGHT = 10.0  # Outweighs the others: a total that can no longer be reached is hard to repair
+# Multi-variant weights: prefer questions no other paper uses, and for
+# followers in a slot the leader's parallel group, then its difficulty and marks
+REUSE_WEIGHT = 2.0
+SLOT_WEIGHT = 2.0
+MIRROR_WEIGHT = 0.5
+
+
+class QuestionPool:
+    """
+    Candidate questions as NumPy arrays, indexed by pool position.
+
+    `parent` and `group` are the exclusion indexes: the pool position of a
+    question's parent (-1 when it has none in the pool) and a dense parallel
+    group number (-1 when ungrouped). `covers` is an (n, m) matrix of course
+    outcome links against the `co_ids` columns.
+    """
+
+    def __init__(self, ids, marks, bloom, difficulty, parent_ids, group_ids, links):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.marks = np.asarray(marks, dtype=np.int64)
+        self.bloom = np.asarray(bloom, dtype=np.int64)
+        self.difficulty = np.asarray(difficulty, dtype=np.int64)
+
+        position = {int(qid): i for i, qid in enumerate(self.ids)}
+        self.parent = np.array([position.get(pid, -1) for pid in parent_ids], dtype=np.int64)
+        groups: dict[int, int] = {}
+        self.group = np.array(
+            [groups.setdefault(gid, len(groups)) if gid is not None else -1 for gid in group_ids],
+            dtype=np.int64
+        )
+
+        self.co_ids = np.array(sorted({co_id for _, co_id in links}), dtype=np.int64)
+        column = {int(co_id): j for j, co_id in enumerate(self.co_ids)}
+        self.covers = np.zeros((len(self.ids), len(self.co_ids)), dtype=bool)
+        for question_id, co_id in links:
+            self.covers[position[question_id], column[co_id]] = True
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, db: Session, subject: str, topics: list[str], statuses: list) -> "QuestionPool":
+        """Read the candidates and their course outcome links in two column-only queries"""
+        conditions = [Question.subject == subject, Question.status.in_(statuses)]
+        if topics:
+            conditions.append(Question.topic.in_(topics))
+        rows = (
+            db.query(
+                Question.id, Question.marks, Question.bloom_level, Question.difficulty,
+                Question.parent_id, Question.parallel_group_id
+            )
+            .filter(*conditions)
+            .order_by(Question.id)
+            .all()
+        )
+        links = (
+            db.query(question_course_outcomes.c.question_id, question_course_outcomes.c.course_outcome_id)
+            .join(Question, Question.id == question_course_outcomes.c.question_id)
+            .filter(and_(*conditions))
+            .all()
+        )
+        return cls(
+            ids=[row.id for row in rows],
+            marks=[row.marks for row in rows],
+            bloom=[BLOOM_LEVELS.index(row.bloom_level.value) for row in rows],
+            difficulty=[DIFFICULTIES.index(row.difficulty.value) for row in rows],
+            parent_ids=[row.parent_id for row in rows],
+            group_ids=[row.parallel_group_id for row in rows],
+            links=[(link.question_id, link.course_outcome_id) for link in links]
+        )
+
+    def exclusions(self, i: int) -> np.ndarray:
+        """Mask of questions that cannot share a paper with question i (itself included)"""
+        mask = self.parent == i
+        mask[i] = True
+        if self.parent[i] >= 0:
+            mask[self.parent[i]] = True
+        if self.group[i] >= 0:
+            mask |= self.group == self.group[i]
+        return mask
+
+
+def bloom_targets(distribution: dict, question_count: int) -> np.ndarray | None:
+    """Split question_count over Bloom levels by weight (largest remainder); None when unconstrained"""
+    weights = np.array([float(distribution.get(level, 0)) for level in BLOOM_LEVELS])
+    if weights.sum() <= 0:
+        return None
+    shares = weights / weights.sum() * question_count
+    counts = np.floor(shares).astype(np.int64)
+    remainder = question_count - counts.sum()
+    counts[np.argsort(-(shares - counts), kind="stable")[:remainder]] += 1
+    return counts
+
+
+class _VariantState:
+    """Running totals for K papers built side by side; every array has a leading variant axis"""
+
+    def __init__(self, pool: QuestionPool, variant_count: int):
+        self.pool = pool
+        n = len(pool)
+        self.blocked = np.zeros((variant_count, n), dtype=np.int64)  # Picks in the paper excluding each question
+        self.member = np.zeros((variant_count, n), dtype=bool)
+        self.uses = np.zeros(n, dtype=np.int64)  # Papers each question appears in
+        self.shared = np.zeros((variant_count, variant_count), dtype=np.int64)  # Questions each pair of papers shares
+        self.co_count = np.zeros((variant_count, len(pool.co_ids)), dtype=np.int64)
+        self.bloom_count = np.zeros((variant_count, len(BLOOM_LEVELS)), dtype=np.int64)
+        self.marks = np.zeros(variant_count, dtype=np.int64)
+        self.picks: list[list[int]] = [[] for _ in range(variant_count)]
+
+    def add(self, k: int, i: int):
+        others = self.member[:, i]
+        self.shared[k] += others
+        self.shared[:, k] += others
+        self.member[k, i] = True
+        self.uses[i] += 1
+        self.blocked[k] += self.pool.exclusions(i)
+        self.co_count[k] += self.pool.covers[i]
+        self.bloom_count[k, self.pool.bloom[i]] += 1
+        self.marks[k] += self.pool.marks[i]
+
+    def remove(self, k: int, i: int):
+        self.member[k, i] = False
+        others = self.member[:, i]
+        self.shared[k] -= others
+        self.shared[:, k] -= others
+        self.uses[i] -= 1
+        self.blocked[k] -= self.pool.exclusions(i)
+        self.co_count[k] -= self.pool.covers[i]
+        self.bloom_count[k, self.pool.bloom[i]] -= 1
+        self.marks[k] -= self.pool.marks[i]
+
+    def overlap_blocked(self, k: int, max_overlap: int | None) -> np.ndarray:
+        """Questions paper k cannot take without sharing more than max_overlap with another paper"""
+        if max_overlap is None:
+            return np.zeros(len(self.pool), dtype=bool)
+        full = self.shared[k] >= max_overlap
+        full[k] = False
+        return self.member[full].any(axis=0)
+
+
+def select_variants(
+    pool: QuestionPool,
+    variant_count: int,
+    question_count: int,
+    total_marks: int | None,
+    bloom_target: np.ndarray | None,
+    required_cos: np.ndarray,
+    rng: np.random.Generator,
+    max_overlap: int | None = None
+) -> list[list[int]]:
+    """
+    Pick up to question_count pool positions for each of variant_count papers.
+
+    No paper holds a parent and its child or two questions of one parallel
+    group, and no two papers share more than max_overlap questions (None for
+    no limit). Papers are filled one slot at a time, all together: one (K, n)
+    score matrix per slot rates every candidate for every paper (course
+    outcome gain, Bloom quota, distance from the marks still needed per
+    remaining slot, reuse across papers). Within a slot a rotating leader picks
+    first and the others favour an unused member of the leader's parallel
+    group, then the leader's difficulty and marks, so the slot is
+    interchangeable across papers. Repair sweeps then swap picks for
+    same-level candidates to close any marks gap without losing coverage.
+    """
+    k_count = variant_count
+    state = _VariantState(pool, k_count)
+    if len(pool) == 0:
+        return state.picks
+    noise = rng.random((k_count, len(pool))) * 1e-3  # Tie-break, so different seeds give different papers
+    if total_marks is not None:
+        mark_values = np.unique(pool.marks)
+        value_index = np.searchsorted(mark_values, pool.marks)
+        reachable = _reachable_sums(mark_values, question_count)
+
+    for step in range(question_count):
+        score = noise.copy()
+        uncovered = required_cos[None, :] & (state.co_count == 0)
+        if uncovered.any():
+            score += CO_WEIGHT * (uncovered.astype(np.float64) @ pool.covers.T)
+        if bloom_target is not None:
+            score += BLOOM_WEIGHT * ((bloom_target[None, :] - state.bloom_count)[:, pool.bloom] > 0)
+        if total_marks is not None:
+            ideal = np.maximum((total_marks - state.marks) / (question_count - step), 1.0)[:, None]
+            score -= MARKS_WEIGHT * np.abs(pool.marks[None, :] - ideal) / ideal
+            # Steer away from marks that leave a total the remaining slots cannot add up to
+            remaining = reachable[question_count - step - 1]
+            for k in range(k_count):
+                needed = total_marks - int(state.marks[k]) - mark_values
+                feasible = np.array([need >= 0 and (remaining >> int(need)) & 1 == 1 for need in needed])
+                score[k] -= FEASIBILITY_WEIGHT * ~feasible[value_index]
+        if k_count > 1:
+            score -= REUSE_WEIGHT * state.uses[None, :]
+
+        leader = None
+        for k in np.roll(np.arange(k_count), -step):
+            row = score[k]
+            if leader is not None:
+                if pool.group[leader] >= 0:
+                    row = row + SLOT_WEIGHT * ((pool.group == pool.group[leader]) & (state.uses == 0))
+                row = row + MIRROR_WEIGHT * (
+                    (pool.difficulty == pool.difficulty[leader]).astype(float)
+                    + (pool.marks == pool.marks[leader])
+                )
+            row = np.where((state.blocked[k] > 0) | state.overlap_blocked(k, max_overlap), -np.inf, row)
+            i = int(np.argmax(row))
+            if row[i] == -np.inf:
+                continue
+            state.add(k, i)
+            state.picks[k].append(i)
+            leader = i if leader is None else leader
+
+    if total_marks is not None:
+        for k in range(k_count):
+            # Repairing towards a total no set of this many marks adds up to only burns time
+            if _is_reachable(reachable[len(state.picks[k])], total_marks):
+                _repair_marks(state, k, total_marks, bloom_target, required_cos, max_overlap)
+    return state.picks
+
+
+def _reachable_sums(mark_values: np.ndarray, question_count: int) -> list[int]:
+    """reachable[r] is a bitset of the totals r questions can add up to (question availability ignored)"""
+    reachable = [1]
+    for _ in range(question_count):
+        sums = 0
+        for value in mark_values:
+            sums |= reachable[-1] << int(value)
+        reachable.append(sums)
+    return reachable
+
+
+def _is_reachable(sums: int, total: int) -> bool:
+    return total >= 0 and (sums >> total) & 1 == 1
+
+
+def _repair_marks(
+    state: _VariantState,
+    k: int,
+    total_marks: int,
+    bloom_target: np.ndarray | None,
+    required_cos: np.ndarray,
+    max_overlap: int | None
+):
+    """
+    Swap picks of paper k for same-level candidates that bring its marks closer
+    to total_marks; when single swaps stall short of it, try replacing two at once
+    """
+    pool = state.pool
+    picks = state.picks[k]
+    for _ in range(REPAIR_SWEEPS):
+        improved = False
+        for slot, p in enumerate(picks):
+            gap = total_marks - int(state.marks[k])
+            if gap == 0:
+                return
+            state.remove(k, p)
+            candidates = _swap_candidates(state, k, p, bloom_target, max_overlap)
+            # Dropping p must not uncover a required course outcome the candidate doesn't bring back
+            lost = required_cos & (state.co_count[k] == 0) & pool.covers[p]
+            if lost.any():
+                candidates &= pool.covers[:, lost].all(axis=1)
+            new_gap = np.abs(gap - (pool.marks - pool.marks[p]))
+            new_gap[~candidates] = np.iinfo(np.int64).max
+            j = int(np.argmin(new_gap))
+            if candidates[j] and new_gap[j] < abs(gap):
+                picks[slot] = j
+                improved = True
+            state.add(k, picks[slot])
+        if not improved:
+            break
+    if total_marks != state.marks[k]:
+        _repair_marks_by_pairs(state, k, total_marks, bloom_target, required_cos, max_overlap)
+
+
+def _repair_marks_by_pairs(
+    state: _VariantState,
+    k: int,
+    total_marks: int,
+    bloom_target: np.ndarray | None,
+    required_cos: np.ndarray,
+    max_overlap: int | None
+):
+    """
+    Replace two picks of paper k so its marks hit total_marks exactly, if any pair allows it
+
+    Pairs whose marks cannot be made up by any two questions of their Bloom levels
+    are ruled out together up front; at most PAIR_REPAIR_MAX_TRIES of the rest are tried.
+    """
+    pool = state.pool
+    picks = state.picks[k]
+    gap = total_marks - int(state.marks[k])
+    pick_marks = pool.marks[picks]
+    needed = gap + pick_marks[:, None] + pick_marks[None, :]
+    if bloom_target is None:
+        values = np.unique(pool.marks)
+        promising = np.isin(needed, np.unique(values[:, None] + values[None, :]))
+    else:
+        values = [np.unique(pool.marks[pool.bloom == level]) for level in range(len(BLOOM_LEVELS))]
+        pick_bloom = pool.bloom[picks]
+        promising = np.zeros(needed.shape, dtype=bool)
+        for level_a in np.unique(pick_bloom):
+            for level_b in np.unique(pick_bloom):
+                pair = (pick_bloom[:, None] == level_a) & (pick_bloom[None, :] == level_b)
+                sums = np.unique(values[level_a][:, None] + values[level_b][None, :])
+                promising |= pair & np.isin(needed, sums)
+
+    tries = 0
+    for a, b in zip(*np.nonzero(np.triu(promising, 1))):
+        p, q = picks[a], picks[b]
+        sole_cover = required_cos & (pool.covers[p] | pool.covers[q]) & (
+            state.co_count[k] == pool.covers[p].astype(np.int64) + pool.covers[q]
+        )
+        if sole_cover.any():
+            continue  # The pair holds the only questions covering a required course outcome
+        tries += 1
+        if tries > PAIR_REPAIR_MAX_TRIES:
+            return
+        state.remove(k, p)
+        state.remove(k, q)
+        for_p = _swap_candidates(state, k, p, bloom_target, max_overlap)
+        for_q = _swap_candidates(state, k, q, bloom_target, max_overlap)
+        for_p[q] = for_q[p] = False
+        # Marks take few distinct values, so match values first and questions second
+        pair_needed = needed[a, b]
+        for value in np.unique(pool.marks[for_p]):
+            if not (for_q & (pool.marks == pair_needed - value)).any():
+                continue
+            j = int(np.flatnonzero(for_p & (pool.marks == value))[0])
+            state.add(k, j)
+            # j may exclude some of q's candidates (same group, parent/child, overlap)
+            for_q_now = for_q & (state.blocked[k] == 0) & ~state.overlap_blocked(k, max_overlap)
+            matches = np.flatnonzero(for_q_now & (pool.marks == pair_needed - value))
+            if len(matches):
+                state.add(k, int(matches[0]))
+                picks[a], picks[b] = j, int(matches[0])
+                return
+            state.remove(k, j)
+        state.add(k, p)
+        state.add(k, q)
+
+
+def _swap_candidates(
+    state: _VariantState,
+    k: int,
+    p: int,
+    bloom_target: np.ndarray | None,
+    max_overlap: int | None
+) -> np.ndarray:
+    """Questions that can take removed pick p's place in paper k"""
+    pool = state.pool
+    candidates = (state.blocked[k] == 0) & ~state.overlap_blocked(k, max_overlap)
+    candidates[p] = False
+    if bloom_target is not None:
+        candidates &= pool.bloom == pool.bloom[p]
+    return candidates
+
+
+def select_questions(
+    pool: QuestionPool,
+    question_count: int,
+    total_marks: int | None,
+    bloom_target: np.ndarray | None,
+    required_cos: np.ndarray,
+    rng: np.random.Generator
+) -> list[int]:
+    """Pick the questions of a single paper (see select_variants)"""
+    return select_variants(pool, 1, question_count, total_marks, bloom_target, required_cos, rng)[0]
+
+
+class PaperAssembler:
+    """Builds question papers from the bank that respect question relations"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def assemble(self, request: PaperAssembleRequest) -> PaperResponse:
+        pool, [picks], bloom_target = self._select(request, variant_count=1, max_overlap=None)
+        return self._build_response(pool, picks, request, bloom_target, self._load_questions(pool, [picks]))
+
+    def assemble_variants(self, request: ExamVariantsRequest) -> ExamVariantsResponse:
+        """Build request.variant_count papers at once, sharing at most request.max_overlap questions pairwise"""
+        pool, variants, bloom_target = self._select(request, request.variant_count, request.max_overlap)
+        questions = self._load_questions(pool, variants)
+        members = [set(picks) for picks in variants]
+        return ExamVariantsResponse(
+            variants=[self._build_response(pool, picks, request, bloom_target, questions) for picks in variants],
+            overlap=[[len(a & b) if a is not b else len(a) for b in members] for a in members]
+        )
+
+    def _select(
+        self,
+        request: PaperAssembleRequest,
+        variant_count: int,
+        max_overlap: int | None
+    ) -> tuple[QuestionPool, list[list[int]], np.ndarray | None]:
+        started = time.perf_counter()
+        pool = QuestionPool.load(
+            self.db, request.subject, request.topics, [status.value for status in request.statuses]
+        )
+        bloom_target = bloom_targets(request.bloom_distribution, request.question_count)
+        variants = select_variants(
+            pool,
+            variant_count,
+            request.question_count,
+            request.total_marks,
+            bloom_target,
+            np.isin(pool.co_ids, request.course_outcome_ids),
+            np.random.default_rng(request.seed),
+            max_overlap
+        )
+        logger.info(
+            f"Assembled {variant_count} paper(s) of up to {request.question_count} questions from a pool of "
+            f"{len(pool)} in {time.perf_counter() - started:.3f}s"
+        )
+        return pool, variants, bloom_target
+
+    def _load_questions(self, pool: QuestionPool, variants: list[list[int]]) -> dict[int, Question]:
+        picked_ids = {int(pool.ids[i]) for picks in variants for i in picks}
+        return {
+            q.id: q for q in (
+                self.db.query(Question)
+                .options(selectinload(Question.course_outcomes))
+                .filter(Question.id.in_(picked_ids))
+                .all()
+            )
+        }
+
+    def _build_response(
+        self,
+        pool: QuestionPool,
+        picks: list[int],
+        request: PaperAssembleRequest,
+        bloom_target: np.ndarray | None,
+        questions: dict[int, Question]
+    ) -> PaperResponse:
+        # Paper order: lower-order thinking first, then by marks
+        picks = sorted(picks, key=lambda i: (pool.bloom[i], pool.marks[i], pool.ids[i]))
+        rows = np.array(picks, dtype=np.int64)
+        total_marks = int(pool.marks[rows].sum())
+        bloom_counts = np.bincount(pool.bloom[rows], minlength=len(BLOOM_LEVELS))
+        difficulty_counts = np.bincount(pool.difficulty[rows], minlength=len(DIFFICULTIES))
+        covered = {int(co_id) for co_id in pool.co_ids[pool.covers[rows].any(axis=0)]}
+        missing = [co_id for co_id in request.course_outcome_ids if co_id not in covered]
+
+        warnings = []
+        if len(picks) < request.question_count:
+            warnings.append(
+                f"Only {len(picks)} of {request.question_count} questions could be selected from "
+                f"{len(pool)} candidates without parent/child, parallel group or overlap conflicts"
+            )
+        if request.total_marks is not None and total_marks != request.total_marks:
+            if _is_reachable(_reachable_sums(np.unique(pool.marks), len(picks))[-1], request.total_marks):
+                warnings.append(f"Total marks {total_marks} differ from the target {request.total_marks}")
+            else:
+                warnings.append(
+                    f"Total marks {request.total_marks} cannot be made from {len(picks)} questions worth "
+                    f"{sorted(int(value) for value in np.unique(pool.marks))} marks; got {total_marks}"
+                )
+        if bloom_target is not None:
+            for level, wanted, got in zip(BLOOM_LEVELS, bloom_target, bloom_counts):
+                if got != wanted:
+                    warnings.append(f"{level}: {got} questions instead of {wanted}")
+        if missing:
+            warnings.append(f"Course outcomes not covered: {missing}")
+
+        return PaperResponse(
+            questions=[to_question_response(questions[int(pool.ids[i])]) for i in picks],
+            total_marks=total_marks,
+            bloom_counts={level: int(count) for level, count in zip(BLOOM_LEVELS, bloom_counts) if count},
+            difficulty_counts={
+                difficulty: int(count) for difficulty, count in zip(DIFFICULTIES, difficulty_counts) if count
+            },
+            covered_course_outcome_ids=sorted(covered),
+            missing_course_outcome_ids=missing,
+            warnings=warnings
+        )
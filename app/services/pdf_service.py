@@ -1,25 +1,221 @@
-from pypdf import PdfReader
-from io import BytesIO
+import asyncio
+import hashlib
+import io
+import mmap
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import BinaryIO
+from app.core.config import get_settings
+from app.core.metrics import pdf_extract_seconds, pdf_pages
+from app.services.document_cache import DocumentCache
+from app.services.pdf_worker import extract_pages_text
+
+settings = get_settings()
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# Extracted text of previously seen PDFs, keyed by content hash
+document_cache = DocumentCache(
+    path=settings.PDF_CACHE_PATH,
+    max_bytes=settings.PDF_CACHE_MAX_BYTES
+) if settings.PDF_CACHE_ENABLED else None
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Forking a server process that runs threads (threadpool, torch) can deadlock the children
+        _pool = ProcessPoolExecutor(max_workers=settings.PDF_EXTRACT_WORKERS, mp_context=get_context("spawn"))
+    return _pool
+
+
+def _page_range_pdf(reader, start: int, stop: int) -> bytes:
+    """Pages [start, stop) of an open document, written out as a standalone PDF"""
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    for i in range(start, stop):
+        writer.add_page(reader.pages[i])
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
 
 class PDFService:
     """Service for handling PDF operations"""
-    
+
     @staticmethod
-    def extract_text(file_content: bytes) -> str:
+    def extract_text(
+        file_content: bytes,
+        first_page: int = 1,
+        last_page: int | None = None,
+        max_chars: int | None = None
+    ) -> str:
         """
-        Extract text from a PDF file
-        
+        Extract text from a PDF held in memory
+
         Args:
             file_content: Raw bytes of the PDF file
-            
+            first_page, last_page, max_chars: See extract_file
+
         Returns:
             Extracted text content
         """
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spooled:
+            spooled.write(file_content)
         try:
-            reader = PdfReader(BytesIO(file_content))
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            return PDFService.extract_file(spooled.name, first_page, last_page, max_chars)
+        finally:
+            os.remove(spooled.name)
+
+    @staticmethod
+    def extract_file(
+        path: str,
+        first_page: int = 1,
+        last_page: int | None = None,
+        max_chars: int | None = None
+    ) -> str:
+        """
+        Extract text from a PDF on disk, PDF_PAGES_PER_TASK pages per worker process
+
+        Args:
+            path: Path of the PDF file (memory-mapped and parsed once; each task gets its pages as a small PDF)
+            first_page: First page to read (1-based)
+            last_page: Last page to read, inclusive (default: the last page)
+            max_chars: Stop once this many characters have been collected
+
+        Returns:
+            Extracted text content, pages separated by newlines
+        """
+        from pypdf import PdfReader
+        try:
+            if os.path.getsize(path) == 0:
+                raise ValueError("empty file")
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # Parsed once here; workers only ever see their own pages
+                reader = PdfReader(mapped)
+                page_count = len(reader.pages)
+                start = max(first_page, 1) - 1
+                stop = min(last_page or page_count, page_count)
+                step = settings.PDF_PAGES_PER_TASK
+                ranges = deque((s, min(s + step, stop)) for s in range(start, stop, step))
+
+                with pdf_extract_seconds.time():
+                    pages = PDFService._extract_ranges(reader, ranges, max_chars)
+            pdf_pages.inc(len(pages))
+            return PDFService._join(pages, max_chars)
         except Exception as e:
             raise Exception(f"Failed to extract text from PDF: {str(e)}")
+
+    @staticmethod
+    def _extract_ranges(reader, ranges: deque, max_chars: int | None) -> list[str]:
+        pages = []
+        collected = 0
+        if len(ranges) <= 1 or settings.PDF_EXTRACT_WORKERS <= 1:
+            while ranges and (max_chars is None or collected < max_chars):
+                start, stop = ranges.popleft()
+                for i in range(start, stop):
+                    text = reader.pages[i].extract_text() or ""
+                    pages.append(text)
+                    collected += len(text) + 1
+            return pages
+
+        # Keep a bounded window of chunks in flight so a character budget stops the work early
+        pool = _get_pool()
+        window = 2 * settings.PDF_EXTRACT_WORKERS
+        in_flight = deque()
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) < window:
+                    in_flight.append(pool.submit(extract_pages_text, _page_range_pdf(reader, *ranges.popleft())))
+                for text in in_flight.popleft().result():
+                    pages.append(text)
+                    collected += len(text) + 1
+                if max_chars is not None and collected >= max_chars:
+                    break
+        finally:
+            for future in in_flight:
+                future.cancel()
+        return pages
+
+    @staticmethod
+    async def extract_upload(
+        upload: BinaryIO,
+        first_page: int = 1,
+        last_page: int | None = None,
+        max_chars: int | None = None
+    ) -> tuple[str, str]:
+        """
+        Spool an uploaded file to disk and extract its text off the event loop
+
+        The upload is hashed first; a document already extracted with the same
+        arguments is served from the document cache without spooling or parsing.
+
+        Args:
+            upload: File object of the upload (read in SPOOL_CHUNK_SIZE chunks)
+            first_page, last_page, max_chars: See extract_file
+
+        Returns:
+            Tuple of (extracted text, sha256 of the file)
+        """
+        content_hash = await asyncio.to_thread(PDFService.hash_file, upload)
+        # The cache is SQLite on disk (and may evict on write), so it is used off the loop too
+        text = await asyncio.to_thread(PDFService.get_cached_text, content_hash, first_page, last_page, max_chars)
+        if text is not None:
+            return text, content_hash
+
+        path = await asyncio.to_thread(PDFService.spool, upload)
+        try:
+            text = await asyncio.to_thread(PDFService.extract_file, path, first_page, last_page, max_chars)
+        finally:
+            os.remove(path)
+        if document_cache is not None:
+            await asyncio.to_thread(
+                document_cache.set_text, PDFService._cache_key(content_hash, first_page, last_page, max_chars), text
+            )
+        return text, content_hash
+
+    @staticmethod
+    def get_cached_text(
+        content_hash: str,
+        first_page: int = 1,
+        last_page: int | None = None,
+        max_chars: int | None = None
+    ) -> str | None:
+        """Text previously extracted from the document with this sha256, or None"""
+        if document_cache is None:
+            return None
+        return document_cache.get_text(PDFService._cache_key(content_hash, first_page, last_page, max_chars))
+
+    @staticmethod
+    def hash_file(upload: BinaryIO) -> str:
+        """sha256 of a file object, read in SPOOL_CHUNK_SIZE chunks"""
+        digest = hashlib.sha256()
+        upload.seek(0)
+        while chunk := upload.read(SPOOL_CHUNK_SIZE):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def spool(upload: BinaryIO) -> str:
+        """Copy a file object to a temporary file without loading it whole; returns its path"""
+        upload.seek(0)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spooled:
+            shutil.copyfileobj(upload, spooled, SPOOL_CHUNK_SIZE)
+        return spooled.name
+
+    @staticmethod
+    def _cache_key(content_hash: str, first_page: int, last_page: int | None, max_chars: int | None) -> str:
+        return f"{content_hash.lower()}:text:{first_page}:{last_page}:{max_chars}"
+
+    @staticmethod
+    def _join(pages: list[str], max_chars: int | None) -> str:
+        text = "\n".join(pages)
+        if max_chars is not None:
+            text = text[:max_chars]
+        return text.strip()
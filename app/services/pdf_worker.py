@@ -0,0 +1,14 @@
+"""
+Page text extraction for the PDF worker processes.
+
+Workers are spawned, so this module only imports pypdf; each task receives
+the bytes of a small PDF holding just its pages.
+"""
+import io
+
+
+def extract_pages_text(pdf_bytes: bytes) -> list[str]:
+    """Text of every page of a (partial) PDF document"""
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    return [page.extract_text() or "" for page in reader.pages]
@@ -107,7 +107,7 @@ class PromptBuilder:
         custom_prompt: str = ""
     ) -> str:
         """Build a prompt for question generation from context"""
-        # Truncate context if too long (rough safety limit)
+        # Callers pass retrieved excerpts (see ContextRetriever); this is only a safety limit
         max_chars = 15000
         safe_context = context[:max_chars] + "..." if len(context) > max_chars else context
         
@@ -0,0 +1,185 @@
+import csv
+import io
+import json
+import logging
+from typing import Iterator
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models.database import Question
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EXPORT_MEDIA_TYPES = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+# Same names as QuestionManualRequest, so a CSV/JSONL export can be imported again
+EXPORT_COLUMNS = [
+    "id", "subject", "topic", "bloom_level", "difficulty", "marks", "question_text",
+    "course_outcome_ids", "course_outcome_codes", "status", "parent_id", "parallel_group_id", "created_at"
+]
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _to_record(question: Question) -> dict:
+    return {
+        "id": question.id,
+        "subject": question.subject,
+        "topic": question.topic,
+        "bloom_level": question.bloom_level.value,
+        "difficulty": question.difficulty.value,
+        "marks": question.marks,
+        "question_text": question.question_text,
+        "course_outcome_ids": [co.id for co in question.course_outcomes],
+        "course_outcome_codes": [co.outcome_code for co in question.course_outcomes],
+        "status": question.status.value,
+        "parent_id": question.parent_id,
+        "parallel_group_id": question.parallel_group_id,
+        "created_at": question.created_at.isoformat() if question.created_at else None
+    }
+
+
+def _iter_batches(
+    subject: str | None,
+    topic: str | None,
+    status: str | None,
+    bloom_level: str | None
+) -> Iterator[list[dict]]:
+    """
+    Matching questions in id order, EXPORT_BATCH_SIZE records at a time
+
+    Pages by id (WHERE id > last ORDER BY id LIMIT n), each a plain buffered
+    query with one extra query for its course outcomes. No cursor stays open
+    between queries, which MySQL's unbuffered cursors would not allow. Uses its
+    own session because the response body is produced after the request's
+    dependencies have finished.
+    """
+    query = select(Question).options(selectinload(Question.course_outcomes)).order_by(Question.id)
+    if subject:
+        query = query.where(Question.subject == subject)
+    if topic:
+        query = query.where(Question.topic == topic)
+    if status:
+        query = query.where(Question.status == status)
+    if bloom_level:
+        query = query.where(Question.bloom_level == bloom_level)
+
+    batch_size = settings.EXPORT_BATCH_SIZE
+    db = SessionLocal()
+    try:
+        exported = 0
+        last_id = 0
+        while True:
+            page = db.scalars(query.where(Question.id > last_id).limit(batch_size)).all()
+            if not page:
+                break
+            records = [_to_record(question) for question in page]
+            last_id = page[-1].id
+            # Only plain dicts leave here; drop the ORM rows before the next page
+            db.expunge_all()
+            exported += len(records)
+            yield records
+            if len(page) < batch_size:
+                break
+        logger.info(f"Exported {exported} questions")
+    finally:
+        db.close()
+
+
+def _jsonl(batches: Iterator[list[dict]]) -> Iterator[bytes]:
+    for records in batches:
+        yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+
+
+def _csv(batches: Iterator[list[dict]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    # Header goes out before the first query finishes
+    yield buffer.getvalue().encode("utf-8")
+    for records in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for record in records:
+            writer.writerow({
+                **record,
+                "course_outcome_ids": ";".join(str(co_id) for co_id in record["course_outcome_ids"]),
+                "course_outcome_codes": ";".join(record["course_outcome_codes"])
+            })
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write target for ParquetWriter whose contents are handed out and dropped after each row group"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet(batches: Iterator[list[dict]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("subject", pa.string()),
+        ("topic", pa.string()),
+        ("bloom_level", pa.string()),
+        ("difficulty", pa.string()),
+        ("marks", pa.int64()),
+        ("question_text", pa.string()),
+        ("course_outcome_ids", pa.list_(pa.int64())),
+        ("course_outcome_codes", pa.list_(pa.string())),
+        ("status", pa.string()),
+        ("parent_id", pa.int64()),
+        ("parallel_group_id", pa.int64()),
+        ("created_at", pa.string())
+    ])
+    sink = _DrainableSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        # One row group per batch, sent as soon as it is written
+        for records in batches:
+            writer.write_table(pa.Table.from_pylist(records, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_questions(
+    fmt: str,
+    subject: str | None = None,
+    topic: str | None = None,
+    status: str | None = None,
+    bloom_level: str | None = None
+) -> Iterator[bytes]:
+    """Stream matching questions as JSONL, CSV or Parquet (requires pyarrow)"""
+    encoders = {"jsonl": _jsonl, "csv": _csv, "parquet": _parquet}
+    return encoders[fmt](_iter_batches(subject, topic, status, bloom_level))
@@ -1,16 +1,22 @@
+import asyncio
 import logging
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from app.core.config import get_settings
 from app.models.database import Question
 from app.models.subject_topic import CourseOutcome
 from app.models.schemas import (
     QuestionGenerateRequest,
     QuestionResponse,
-    QuestionMetadata
+    QuestionListResponse
 )
 from app.services.prompt_builder import PromptBuilder
 from app.services.llm_client import llm_client
 from app.services.validator import QuestionValidator
+from app.services.context_retriever import ContextRetriever
+from app.services.pagination import paginate_questions
+from app.services.question_writer import QuestionWriter, to_question_response
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
@@ -21,18 +27,20 @@ class QuestionGeneratorService:
         self.db = db
         self.prompt_builder = PromptBuilder()
         self.validator = QuestionValidator()
+        # Requested questions left out of the last generation (failed or past the deadline)
+        self.shortfall = 0
     
-    def generate_questions(self, request: QuestionGenerateRequest) -> list[QuestionResponse]:
+    async def generate_questions(self, request: QuestionGenerateRequest) -> list[QuestionResponse]:
         """
         Generate multiple questions based on the request parameters
         """
         count = getattr(request, 'count', 1)
         logger.info(f"Starting batch generation of {count} questions for subject: {request.subject}, topic: {request.topic}")
         
-        responses = []
+        # Sync SQLAlchemy work runs off the event loop; only the LLM calls are awaited here
+        selected_cos, co_suffix = await asyncio.to_thread(self._load_course_outcomes, request)
+        prompts = []
         for i in range(count):
-            logger.info(f"Generating question {i+1}/{count}...")
-            
             # Build canonical prompt
             prompt = self.prompt_builder.build_question_prompt(
                 subject=request.subject,
@@ -46,67 +54,16 @@ class QuestionGeneratorService:
             if count > 1:
                 prompt += f"\n\nNote: This is question {i+1} of {count}. Please ensure it is unique and covers a different aspect of the topic than previous questions."
             
-            # Handle Course Outcomes
-            selected_cos = []
-            if request.course_outcome_ids:
-                selected_cos = self.db.query(CourseOutcome).filter(CourseOutcome.id.in_(request.course_outcome_ids)).all()
-                if selected_cos:
-                    co_text = "\n".join([f"- {co.outcome_code}: {co.description}" for co in selected_cos])
-                    prompt += f"\n\nTarget Course Outcomes:\n{co_text}"
-            
-            logger.debug(f"Prompt sent to LLM for question {i+1}: {prompt[:200]}...")
-            
-            # Generate question using LLM
-            question_text = llm_client.generate(prompt)
-            logger.info(f"LLM generated content for question {i+1}")
-            
-            # Validate question
-            is_valid, validation_message = self.validator.validate_question(
-                question_text=question_text,
-                bloom_level=request.bloom_level,
-                marks=request.marks
-            )
-            
-            if not is_valid:
-                logger.warning(f"Validation failed for question {i+1}: {validation_message}. Retrying...")
-                question_text = llm_client.generate(prompt + "\n\nIMPORTANT: Previous attempt failed validation. Please ensure strict adherence to Bloom's Taxonomy and marks constraints.")
-            
-            # Save to database
-            db_question = Question(
-                subject=request.subject,
-                topic=request.topic,
-                bloom_level=request.bloom_level,
-                difficulty=request.difficulty,
-                marks=request.marks,
-                question_text=question_text
-            )
-            
-            if selected_cos:
-                db_question.course_outcomes = selected_cos
-            
-            self.db.add(db_question)
-            self.db.commit()
-            self.db.refresh(db_question)
-            logger.info(f"Saved question {i+1} to database with ID: {db_question.id}")
-            
-            responses.append(QuestionResponse(
-                id=db_question.id,
-                question_text=db_question.question_text,
-                status=db_question.status,
-                metadata=QuestionMetadata(
-                    subject=db_question.subject,
-                    topic=db_question.topic,
-                    bloom_level=db_question.bloom_level,
-                    difficulty=db_question.difficulty,
-                    marks=db_question.marks
-                ),
-                course_outcomes=db_question.course_outcomes,
-                created_at=db_question.created_at
-            ))
-            
-        return responses
+            prompts.append(prompt + co_suffix)
+        
+        question_texts = await self._generate_all(
+            prompts,
+            request,
+            retry_suffix="\n\nIMPORTANT: Previous attempt failed validation. Please ensure strict adherence to Bloom's Taxonomy and marks constraints."
+        )
+        return await asyncio.to_thread(self._save_questions, request, question_texts, selected_cos)
 
-    def generate_questions_from_context(
+    async def generate_questions_from_context(
         self, 
         context: str,
         request: QuestionGenerateRequest,
@@ -118,13 +75,15 @@ class QuestionGeneratorService:
         count = getattr(request, 'count', 1)
         logger.info(f"Starting batch context generation of {count} questions for subject: {request.subject}")
         
-        responses = []
-        for i in range(count):
-            logger.info(f"Generating context question {i+1}/{count}...")
-            
+        selected_cos, co_suffix = await asyncio.to_thread(self._load_course_outcomes, request)
+        # Each question gets its own excerpt of the chunks most relevant to the topic
+        query = f"{request.subject}: {request.topic}. {custom_prompt}".strip()
+        excerpts = await asyncio.to_thread(ContextRetriever().select_contexts, context, query, count)
+        prompts = []
+        for i, excerpt in enumerate(excerpts):
             # Build prompt with context
             prompt = self.prompt_builder.build_context_question_prompt(
-                context=context,
+                context=excerpt,
                 subject=request.subject,
                 topic=request.topic,
                 bloom_level=request.bloom_level,
@@ -136,95 +95,126 @@ class QuestionGeneratorService:
             if count > 1:
                 prompt += f"\n\nNote: This is question {i+1} of {count}. Please focus on a unique section of the context."
             
-            # Handle Course Outcomes
-            selected_cos = []
-            if request.course_outcome_ids:
-                selected_cos = self.db.query(CourseOutcome).filter(CourseOutcome.id.in_(request.course_outcome_ids)).all()
-                if selected_cos:
-                    co_text = "\n".join([f"- {co.outcome_code}: {co.description}" for co in selected_cos])
-                    prompt += f"\n\nTarget Course Outcomes:\n{co_text}"
-            
-            logger.debug(f"Context prompt sent for question {i+1}")
-            
-            # Generate question using LLM
-            question_text = llm_client.generate(prompt)
-            
-            # Validate question
-            is_valid, validation_message = self.validator.validate_question(
+            prompts.append(prompt + co_suffix)
+        
+        question_texts = await self._generate_all(prompts, request)
+        return await asyncio.to_thread(self._save_questions, request, question_texts, selected_cos)
+
+    def _load_course_outcomes(self, request: QuestionGenerateRequest) -> tuple[list[CourseOutcome], str]:
+        """Fetch the requested course outcomes once and build the prompt suffix for them"""
+        if not request.course_outcome_ids:
+            return [], ""
+        selected_cos = self.db.query(CourseOutcome).filter(CourseOutcome.id.in_(request.course_outcome_ids)).all()
+        if not selected_cos:
+            return [], ""
+        co_text = "\n".join([f"- {co.outcome_code}: {co.description}" for co in selected_cos])
+        return selected_cos, f"\n\nTarget Course Outcomes:\n{co_text}"
+
+    async def _generate_one(self, index: int, prompt: str, request: QuestionGenerateRequest, retry_suffix: str) -> str:
+        """Generate and validate one question, retrying straight away if validation fails"""
+        logger.debug(f"Prompt sent to LLM for question {index+1}: {prompt[:200]}...")
+        question_text = await llm_client.agenerate(prompt)
+        logger.info(f"LLM generated content for question {index+1}")
+        
+        # Validate question
+        is_valid, validation_message = self.validator.validate_question(
+            question_text=question_text,
+            bloom_level=request.bloom_level,
+            marks=request.marks
+        )
+        
+        if not is_valid:
+            logger.warning(f"Validation failed for question {index+1}: {validation_message}. Retrying...")
+            question_text = await llm_client.agenerate(prompt + retry_suffix)
+        return question_text
+
+    async def _generate_all(
+        self,
+        prompts: list[str],
+        request: QuestionGenerateRequest,
+        retry_suffix: str = ""
+    ) -> list[str]:
+        """
+        Run all generations concurrently (bounded by the LLM client) within GENERATION_DEADLINE
+
+        Questions that fail or miss the deadline are dropped and counted in
+        `shortfall`; if none succeed the first error is raised
+        (asyncio.TimeoutError when the deadline was hit).
+        """
+        tasks = [
+            asyncio.create_task(self._generate_one(i, prompt, request, retry_suffix))
+            for i, prompt in enumerate(prompts)
+        ]
+        done, pending = await asyncio.wait(tasks, timeout=settings.GENERATION_DEADLINE)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"{len(pending)} of {len(tasks)} questions missed the generation deadline")
+
+        question_texts = []
+        errors = []
+        for task in tasks:  # Keep prompt order
+            if task in pending:
+                continue
+            if task.exception() is not None:
+                logger.error(f"Question generation failed: {task.exception()}")
+                errors.append(task.exception())
+            else:
+                question_texts.append(task.result())
+
+        self.shortfall = len(tasks) - len(question_texts)
+        if not question_texts:
+            raise errors[0] if errors else asyncio.TimeoutError("Question generation deadline exceeded")
+        return question_texts
+
+    def _save_questions(
+        self,
+        request: QuestionGenerateRequest,
+        question_texts: list[str],
+        selected_cos: list[CourseOutcome]
+    ) -> list[QuestionResponse]:
+        """Persist generated questions in one transaction and build their responses"""
+        writer = QuestionWriter(self.db)
+        for question_text in question_texts:
+            writer.add(
                 question_text=question_text,
-                bloom_level=request.bloom_level,
-                marks=request.marks
-            )
-            
-            if not is_valid:
-                logger.warning(f"Context validation failed for question {i+1}. Retrying...")
-                question_text = llm_client.generate(prompt)
-            
-            # Save to database
-            db_question = Question(
                 subject=request.subject,
                 topic=request.topic,
                 bloom_level=request.bloom_level,
                 difficulty=request.difficulty,
                 marks=request.marks,
-                question_text=question_text
+                course_outcomes=selected_cos
             )
-            
-            if selected_cos:
-                db_question.course_outcomes = selected_cos
-                
-            self.db.add(db_question)
-            self.db.commit()
-            self.db.refresh(db_question)
-            logger.info(f"Saved context question {i+1} with ID: {db_question.id}")
-            
-            responses.append(QuestionResponse(
-                id=db_question.id,
-                question_text=db_question.question_text,
-                status=db_question.status,
-                metadata=QuestionMetadata(
-                    subject=db_question.subject,
-                    topic=db_question.topic,
-                    bloom_level=db_question.bloom_level,
-                    difficulty=db_question.difficulty,
-                    marks=db_question.marks
-                ),
-                course_outcomes=db_question.course_outcomes,
-                created_at=db_question.created_at
-            ))
-            
-        return responses
+        return writer.save()
     
     def get_question_by_id(self, question_id: int) -> QuestionResponse | None:
         """Get a question by ID"""
-        question = self.db.query(Question).filter(Question.id == question_id).first()
+        question = (
+            self.db.query(Question)
+            .options(selectinload(Question.course_outcomes))
+            .filter(Question.id == question_id)
+            .first()
+        )
         
         if not question:
             return None
         
-        return QuestionResponse(
-            id=question.id,
-            question_text=question.question_text,
-            status=question.status,
-            metadata=QuestionMetadata(
-                subject=question.subject,
-                topic=question.topic,
-                bloom_level=question.bloom_level,
-                difficulty=question.difficulty,
-                marks=question.marks
-            ),
-            course_outcomes=question.course_outcomes,
-            created_at=question.created_at
-        )
+        return to_question_response(question)
     
     def list_questions(
         self,
         subject: str | None = None,
         topic: str | None = None,
         bloom_level: str | None = None,
-        limit: int = 50
-    ) -> list[QuestionResponse]:
-        """List questions with optional filters"""
+        limit: int = 50,
+        cursor: str | None = None
+    ) -> QuestionListResponse:
+        """
+        List questions with optional filters, newest first, keyset-paginated
+
+        Raises:
+            ValueError: If the cursor is invalid
+        """
         query = self.db.query(Question)
         
         if subject:
@@ -234,22 +224,14 @@ class QuestionGeneratorService:
         if bloom_level:
             query = query.filter(Question.bloom_level == bloom_level)
         
-        questions = query.order_by(Question.created_at.desc()).limit(limit).all()
+        total = query.count()
+        # Course outcomes for the whole page come in one extra query instead of one per row
+        questions, next_cursor = paginate_questions(
+            query.options(selectinload(Question.course_outcomes)), limit, cursor
+        )
         
-        return [
-            QuestionResponse(
-                id=q.id,
-                question_text=q.question_text,
-                status=q.status,
-                metadata=QuestionMetadata(
-                    subject=q.subject,
-                    topic=q.topic,
-                    bloom_level=q.bloom_level,
-                    difficulty=q.difficulty,
-                    marks=q.marks
-                ),
-                course_outcomes=q.course_outcomes,
-                created_at=q.created_at
-            )
-            for q in questions
-        ]
+        return QuestionListResponse(
+            questions=[to_question_response(q) for q in questions],
+            total=total,
+            next_cursor=next_cursor
+        )
@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+import logging
+import re
+from typing import BinaryIO, Callable, Iterable, Iterator
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.models.schemas import ImportRowError, QuestionImportResponse, QuestionManualRequest
+from app.models.subject_topic import CourseOutcome
+from app.services.question_writer import QuestionWriter
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# A parsed row, or the reason the line could not be parsed
+ParsedRow = tuple[int, dict | str]
+
+
+def detect_format(filename: str | None, declared: str | None = None) -> str:
+    """
+    Pick the import format from the declared value or the file extension
+
+    Raises:
+        ValueError: If neither names a supported format
+    """
+    fmt = (declared or (filename or "").rsplit(".", 1)[-1]).lower()
+    if fmt in ("json", "ndjson"):
+        fmt = "jsonl"
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format '{fmt}', expected one of: {', '.join(IMPORT_FORMATS)}")
+    return fmt
+
+
+def iter_csv_rows(file: BinaryIO) -> Iterator[ParsedRow]:
+    """
+    Read CSV records one at a time; the header names QuestionManualRequest fields
+
+    course_outcome_ids cells hold ids separated by commas, semicolons or spaces.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        reader = csv.DictReader(text)
+        try:
+            for record in reader:
+                if None in record:
+                    yield reader.line_num, "Row has more cells than the header"
+                    continue
+                row = {key.strip(): value.strip() for key, value in record.items() if value and value.strip()}
+                if "course_outcome_ids" in row:
+                    row["course_outcome_ids"] = [part for part in re.split(r"[,;\s]+", row["course_outcome_ids"]) if part]
+                yield reader.line_num, row
+        except csv.Error as e:
+            # The reader cannot resume after malformed input
+            yield reader.line_num, f"Malformed CSV, import stopped here: {e}"
+    finally:
+        text.detach()
+
+
+def iter_jsonl_rows(file: BinaryIO) -> Iterator[ParsedRow]:
+    """Read one JSON object per line, skipping blank lines"""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace")
+    try:
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, f"Invalid JSON: {e.msg}"
+                continue
+            if not isinstance(row, dict):
+                yield line_number, "Expected a JSON object"
+                continue
+            yield line_number, row
+    finally:
+        text.detach()
+
+
+class QuestionImporter:
+    """
+    Validates parsed rows with QuestionManualRequest and writes them in chunks
+    of IMPORT_CHUNK_SIZE, one transaction per chunk.
+
+    Only one chunk is held in memory, so the cost of an import does not grow
+    with the file. `on_chunk` receives the ids of each written chunk (used to
+    queue their embeddings).
+    """
+
+    def __init__(self, db: Session, on_chunk: Callable[[list[int]], None] | None = None):
+        self.db = db
+        self.on_chunk = on_chunk
+        self.total_rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: list[ImportRowError] = []
+
+    def run(self, rows: Iterable[ParsedRow]) -> QuestionImportResponse:
+        chunk: list[tuple[int, QuestionManualRequest]] = []
+        for line_number, row in rows:
+            self.total_rows += 1
+            if isinstance(row, str):
+                self._fail(line_number, [row])
+                continue
+            try:
+                chunk.append((line_number, QuestionManualRequest.model_validate(row)))
+            except ValidationError as e:
+                self._fail(line_number, [
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                ])
+                continue
+            if len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+                self._write_chunk(chunk)
+                chunk = []
+        self._write_chunk(chunk)
+
+        logger.info(f"Imported {self.imported} of {self.total_rows} rows ({self.failed} failed)")
+        return QuestionImportResponse(
+            total_rows=self.total_rows,
+            imported=self.imported,
+            failed=self.failed,
+            errors=self.errors,
+            errors_truncated=self.failed > len(self.errors)
+        )
+
+    def _write_chunk(self, chunk: list[tuple[int, QuestionManualRequest]]):
+        if not chunk:
+            return
+        # Course outcomes for the whole chunk in one query
+        wanted = {co_id for _, request in chunk for co_id in request.course_outcome_ids}
+        course_outcomes = {}
+        if wanted:
+            course_outcomes = {
+                co.id: co for co in self.db.query(CourseOutcome).filter(CourseOutcome.id.in_(wanted)).all()
+            }
+
+        writer = QuestionWriter(self.db)
+        written_lines = []
+        for line_number, request in chunk:
+            missing = [co_id for co_id in request.course_outcome_ids if co_id not in course_outcomes]
+            if missing:
+                self._fail(line_number, [f"course_outcome_ids: unknown course outcome id(s) {missing}"])
+                continue
+            writer.add(
+                question_text=request.question_text,
+                subject=request.subject,
+                topic=request.topic,
+                bloom_level=request.bloom_level,
+                difficulty=request.difficulty,
+                marks=request.marks,
+                course_outcomes=[course_outcomes[co_id] for co_id in request.course_outcome_ids]
+            )
+            written_lines.append(line_number)
+
+        try:
+            responses = writer.save(publish=False)
+        except SQLAlchemyError as e:
+            logger.error(f"Import chunk of {len(written_lines)} rows failed: {e}")
+            for line_number in written_lines:
+                self._fail(line_number, [f"Database error: {e.__class__.__name__}"])
+            return
+        self.imported += len(responses)
+        # Drop the written rows from the session so memory stays flat across chunks
+        self.db.expunge_all()
+        if self.on_chunk is not None:
+            self.on_chunk([response.id for response in responses])
+
+    def _fail(self, line_number: int, messages: list[str]):
+        self.failed += 1
+        if len(self.errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append(ImportRowError(row=line_number, errors=messages))
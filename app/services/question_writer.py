@@ -0,0 +1,127 @@
+import logging
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.core.websocket import publish_new_questions
+from app.models.database import Question, QuestionStatus, question_course_outcomes
+from app.models.subject_topic import CourseOutcome
+from app.models.schemas import QuestionResponse, QuestionMetadata
+from app.services.status_counts import status_counts
+
+logger = logging.getLogger(__name__)
+
+
+def to_question_response(question: Question) -> QuestionResponse:
+    """Build the API representation of a question (load course_outcomes eagerly beforehand)"""
+    return QuestionResponse(
+        id=question.id,
+        question_text=question.question_text,
+        status=question.status,
+        metadata=QuestionMetadata(
+            subject=question.subject,
+            topic=question.topic,
+            bloom_level=question.bloom_level,
+            difficulty=question.difficulty,
+            marks=question.marks
+        ),
+        course_outcomes=question.course_outcomes,
+        parent_id=question.parent_id,
+        parallel_group_id=question.parallel_group_id,
+        created_at=question.created_at
+    )
+
+
+class QuestionWriter:
+    """
+    Unit of work for new questions.
+
+    Collect rows with add(), then save() writes all of them and their
+    question_course_outcomes links in one transaction: one multi-row INSERT ...
+    RETURNING for the questions (on backends without it, such as MySQL, a
+    multi-row INSERT and one SELECT of the new ids) and one executemany for
+    the links.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._pending: list[tuple[dict, list[CourseOutcome]]] = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(
+        self,
+        question_text: str,
+        subject: str,
+        topic: str,
+        bloom_level,
+        difficulty,
+        marks: int,
+        course_outcomes: list[CourseOutcome] | None = None,
+        status: QuestionStatus = QuestionStatus.DEDUPE_PENDING
+    ):
+        row = {
+            "question_text": question_text,
+            "subject": subject,
+            "topic": topic,
+            "bloom_level": bloom_level,
+            "difficulty": difficulty,
+            "marks": marks,
+            "status": status
+        }
+        self._pending.append((row, list(course_outcomes or [])))
+
+    def save(self, publish: bool = True) -> list[QuestionResponse]:
+        """
+        Write everything added since the last save and commit
+
+        Returns:
+            Responses for the new questions, in the order they were added
+        """
+        if not self._pending:
+            return []
+        pending, self._pending = self._pending, []
+        rows = [row for row, _ in pending]
+
+        try:
+            if self.db.get_bind().dialect.insert_executemany_returning:
+                # sort_by_parameter_order would fall back to one INSERT per row here (no sentinel
+                # column); autoincrement ids follow VALUES order, so sorting by id restores it
+                questions = sorted(
+                    self.db.scalars(insert(Question).returning(Question), rows),
+                    key=lambda question: question.id
+                )
+            else:
+                # One multi-row INSERT; a single statement gets consecutive autoincrement ids
+                # (InnoDB reserves them together for a known row count), then one SELECT reads
+                # the rows back with their server defaults
+                result = self.db.execute(insert(Question).values(rows))
+                first_id = result.lastrowid
+                if self.db.get_bind().dialect.name == "sqlite":
+                    first_id -= len(rows) - 1  # SQLite reports the last row's id, MySQL the first's
+                questions = list(self.db.scalars(
+                    select(Question)
+                    .where(Question.id.between(first_id, first_id + len(rows) - 1))
+                    .order_by(Question.id)
+                ))
+
+            links = []
+            for question, (_, course_outcomes) in zip(questions, pending):
+                # The links are inserted below; mark the collection loaded so nothing is re-read or re-written
+                set_committed_value(question, "course_outcomes", course_outcomes)
+                links.extend({"question_id": question.id, "course_outcome_id": co.id} for co in course_outcomes)
+            if links:
+                self.db.execute(insert(question_course_outcomes), links)
+
+            # Built before commit, which would expire the rows and cost a SELECT each to read back
+            responses = [to_question_response(question) for question in questions]
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        logger.info(f"Saved {len(responses)} questions ({len(links)} course outcome links) in one transaction")
+        status_counts.invalidate()
+        if publish:
+            publish_new_questions(responses)
+        return responses
@@ -0,0 +1,51 @@
+import hashlib
+import json
+import threading
+import time
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.models.database import Question, QuestionStatus
+
+settings = get_settings()
+
+
+class StatusCountsCache:
+    """
+    Per-status question counts for the dashboard, computed with one GROUP BY
+    and reused for `ttl_seconds` so polling tabs don't each hit the database.
+
+    Endpoints that change question status call invalidate() so their own
+    follow-up refresh is exact; other writers are picked up within the TTL.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] | None = None
+        self._etag: str | None = None
+        self._expires_at = 0.0
+
+    def get(self, db: Session) -> tuple[dict[str, int], str]:
+        """Return (counts by status name, ETag of those counts)"""
+        with self._lock:
+            if self._counts is not None and time.monotonic() < self._expires_at:
+                return self._counts, self._etag
+
+        rows = db.query(Question.status, func.count(Question.id)).group_by(Question.status).all()
+        counts = {status.value: 0 for status in QuestionStatus}
+        counts.update({status.value: count for status, count in rows})
+        # The ETag depends only on the counts, so it survives cache refreshes that change nothing
+        etag = '"' + hashlib.sha1(json.dumps(counts, sort_keys=True).encode("utf-8")).hexdigest() + '"'
+
+        with self._lock:
+            self._counts, self._etag = counts, etag
+            self._expires_at = time.monotonic() + self.ttl_seconds
+        return counts, etag
+
+    def invalidate(self):
+        with self._lock:
+            self._counts = None
+
+
+status_counts = StatusCountsCache(ttl_seconds=settings.DASHBOARD_STATS_TTL_SECONDS)
@@ -0,0 +1,331 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.models.database import Question, QuestionStatus, QuestionEmbedding
+from app.services.embedding_store import LOOKUP_CHUNK_SIZE, EmbeddingStore, text_hash
+from app.services.lexical_index import LexicalIndex
+
+try:
+    import hnswlib
+except ImportError:  # Optional dependency, the exact index is always available
+    hnswlib = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Statuses that make a question part of the bank new questions are compared against
+INDEXED_STATUSES = (QuestionStatus.APPROVED, QuestionStatus.DEDUPE_APPROVED)
+
+# A search hit: (question_id, cosine similarity)
+Hit = Tuple[int, float]
+
+
+class VectorIndex(ABC):
+    """Interface for nearest-neighbour search over normalized question vectors"""
+
+    @abstractmethod
+    def add(self, ids: List[int], vectors: np.ndarray):
+        ...
+
+    @abstractmethod
+    def remove(self, ids: Iterable[int]):
+        ...
+
+    @abstractmethod
+    def search(
+        self,
+        vectors: np.ndarray,
+        k: int,
+        threshold: float,
+        exclude_ids: Optional[Set[int]] = None
+    ) -> List[List[Hit]]:
+        """Return, for each query row, up to k hits scoring >= threshold, best first"""
+
+    @abstractmethod
+    def items(self) -> Tuple[List[int], np.ndarray]:
+        """Return all live ids and their vectors (used when migrating backends)"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force NumPy index, exact and fast enough for small partitions"""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+
+    def add(self, ids, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        self.remove(ids)
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.matrix = np.vstack([self.matrix, vectors])
+
+    def remove(self, ids):
+        ids = np.fromiter(ids, dtype=np.int64)
+        if len(ids) and len(self.ids):
+            keep = ~np.isin(self.ids, ids)
+            self.ids = self.ids[keep]
+            self.matrix = self.matrix[keep]
+
+    def search(self, vectors, k, threshold, exclude_ids=None):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if not len(self.ids):
+            return [[] for _ in range(len(vectors))]
+
+        scores = vectors @ self.matrix.T
+        if exclude_ids:
+            scores[:, np.isin(self.ids, list(exclude_ids))] = -np.inf
+
+        top = min(k, len(self.ids))
+        results = []
+        for row in scores:
+            best = np.argpartition(-row, top - 1)[:top]
+            best = best[np.argsort(-row[best])]
+            results.append([
+                (int(self.ids[i]), float(row[i]))
+                for i in best if row[i] >= threshold
+            ])
+        return results
+
+    def items(self):
+        return self.ids.tolist(), self.matrix
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class HNSWIndex(VectorIndex):
+    """Approximate index backed by hnswlib (inner product on normalized vectors)"""
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self.index = hnswlib.Index(space="ip", dim=dim)
+        self.index.init_index(
+            max_elements=capacity,
+            ef_construction=settings.DEDUPE_HNSW_EF_CONSTRUCTION,
+            M=settings.DEDUPE_HNSW_M
+        )
+        self.index.set_ef(settings.DEDUPE_HNSW_EF_SEARCH)
+        self.live: Dict[int, np.ndarray] = {}
+        self.deleted: Set[int] = set()
+
+    def add(self, ids, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        needed = self.index.get_current_count() + len(ids)
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(max(needed, 2 * self.index.get_max_elements()))
+
+        for qid in ids:
+            if qid in self.deleted:
+                self.index.unmark_deleted(qid)
+                self.deleted.discard(qid)
+        self.index.add_items(vectors, np.asarray(ids, dtype=np.int64))
+        for qid, vector in zip(ids, vectors):
+            self.live[qid] = vector
+
+    def remove(self, ids):
+        for qid in ids:
+            if qid in self.live:
+                self.index.mark_deleted(qid)
+                self.deleted.add(qid)
+                del self.live[qid]
+
+    def search(self, vectors, k, threshold, exclude_ids=None):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        exclude_ids = exclude_ids or set()
+        top = min(k + len(exclude_ids), len(self.live))
+        if top == 0:
+            return [[] for _ in range(len(vectors))]
+
+        self.index.set_ef(max(settings.DEDUPE_HNSW_EF_SEARCH, top))
+        labels, distances = self.index.knn_query(vectors, k=top)
+        results = []
+        for row_labels, row_distances in zip(labels, distances):
+            hits = []
+            for label, distance in zip(row_labels, row_distances):
+                score = 1.0 - float(distance)  # ip distance is 1 - dot
+                if int(label) in exclude_ids or score < threshold:
+                    continue
+                hits.append((int(label), score))
+                if len(hits) == k:
+                    break
+            results.append(hits)
+        return results
+
+    def items(self):
+        ids = list(self.live)
+        if not ids:
+            return ids, np.zeros((0, self.dim), dtype=np.float32)
+        return ids, np.stack([self.live[qid] for qid in ids])
+
+    def __len__(self):
+        return len(self.live)
+
+
+class SubjectPartitionedIndex:
+    """
+    Per-subject vector indexes over the dedupe bank.
+
+    Partitions start as ExactIndex and are promoted to HNSW once they grow past
+    DEDUPE_HNSW_MIN_SIZE (when hnswlib is installed). The index is kept current
+    incrementally through `sync`, and reconciled against the database periodically
+    so changes made by other worker processes are eventually picked up.
+
+    The per-subject TF-IDF statistics used by the Layer-2 lexical check follow the
+    same membership and are kept alongside.
+    """
+
+    def __init__(self):
+        self.partitions: Dict[str, VectorIndex] = {}
+        self.lexical = LexicalIndex()
+        self.subject_of: Dict[int, str] = {}
+        # Hash of the text each indexed vector was computed from
+        self.text_hash_of: Dict[int, str] = {}
+        self.lock = threading.RLock()
+        self.built = False
+        self.last_reconciled = 0.0
+
+    def _partition(self, subject: str, dim: int) -> VectorIndex:
+        index = self.partitions.get(subject)
+        if index is None:
+            index = ExactIndex(dim)
+            self.partitions[subject] = index
+        return index
+
+    def _maybe_promote(self, subject: str):
+        index = self.partitions[subject]
+        if hnswlib is None or not isinstance(index, ExactIndex):
+            return
+        if len(index) < settings.DEDUPE_HNSW_MIN_SIZE:
+            return
+        logger.info(f"Promoting '{subject}' partition ({len(index)} vectors) to HNSW")
+        ids, vectors = index.items()
+        promoted = HNSWIndex(index.dim, capacity=2 * len(ids))
+        promoted.add(ids, vectors)
+        self.partitions[subject] = promoted
+
+    def add(self, subject: str, ids: List[int], vectors: np.ndarray):
+        if not ids:
+            return
+        with self.lock:
+            # A question may have moved subject since it was indexed
+            self.remove([qid for qid in ids if self.subject_of.get(qid, subject) != subject])
+            self._partition(subject, vectors.shape[1]).add(ids, vectors)
+            for qid in ids:
+                self.subject_of[qid] = subject
+            self._maybe_promote(subject)
+
+    def remove(self, ids: Iterable[int]):
+        with self.lock:
+            by_subject: Dict[str, List[int]] = {}
+            for qid in ids:
+                subject = self.subject_of.pop(qid, None)
+                self.text_hash_of.pop(qid, None)
+                if subject is not None:
+                    by_subject.setdefault(subject, []).append(qid)
+            for subject, subject_ids in by_subject.items():
+                self.partitions[subject].remove(subject_ids)
+            self.lexical.remove([qid for subject_ids in by_subject.values() for qid in subject_ids])
+
+    def search(
+        self,
+        subject: str,
+        vectors: np.ndarray,
+        k: int,
+        threshold: float,
+        exclude_ids: Optional[Set[int]] = None
+    ) -> List[List[Hit]]:
+        with self.lock:
+            index = self.partitions.get(subject)
+            if index is None:
+                return [[] for _ in range(len(vectors))]
+            return index.search(vectors, k, threshold, exclude_ids)
+
+    def lexical_similarities(self, subject: str, texts_a: List[str], texts_b: List[str]) -> np.ndarray:
+        """TF-IDF cosine similarity of aligned text pairs, weighted by the subject's IDF"""
+        with self.lock:
+            return self.lexical.pair_similarities(subject, texts_a, texts_b)
+
+    def sync(self, store: EmbeddingStore, questions: List[Question]):
+        """Add or remove questions according to their current status"""
+        if not self.built:
+            return  # Picked up by the initial build
+        active = [q for q in questions if q.status in INDEXED_STATUSES]
+        self.remove([q.id for q in questions if q.status not in INDEXED_STATUSES])
+        if active:
+            self._add_questions(active, store.get_vectors(active))
+
+    def _add_questions(self, questions: List[Question], vectors: np.ndarray):
+        by_subject: Dict[str, List[int]] = {}
+        for row, q in enumerate(questions):
+            by_subject.setdefault(q.subject, []).append(row)
+        for subject, rows in by_subject.items():
+            ids = [questions[r].id for r in rows]
+            with self.lock:
+                self.add(subject, ids, vectors[rows])
+                self.lexical.add(subject, ids, [questions[r].question_text for r in rows])
+                for r in rows:
+                    self.text_hash_of[questions[r].id] = text_hash(questions[r].question_text)
+
+    def ensure_ready(self, db: Session, store: EmbeddingStore):
+        """Build on first use, then reconcile with the database every few seconds"""
+        with self.lock:
+            if not self.built:
+                self._build(db, store)
+            elif time.monotonic() - self.last_reconciled > settings.DEDUPE_INDEX_REFRESH_SECONDS:
+                self._reconcile(db, store)
+
+    def _build(self, db: Session, store: EmbeddingStore):
+        started = time.monotonic()
+        rows = db.query(Question, QuestionEmbedding).outerjoin(
+            QuestionEmbedding, QuestionEmbedding.question_id == Question.id
+        ).filter(Question.status.in_(INDEXED_STATUSES)).all()
+
+        questions = [q for q, _ in rows]
+        if questions:
+            records = {q.id: emb for q, emb in rows if emb is not None}
+            self._add_questions(questions, store.get_vectors(questions, records))
+
+        self.built = True
+        self.last_reconciled = time.monotonic()
+        logger.info(f"Built dedupe vector index with {len(questions)} questions in {time.monotonic() - started:.2f}s")
+
+    def _reconcile(self, db: Session, store: EmbeddingStore):
+        rows = db.query(Question.id, Question.subject, QuestionEmbedding.text_hash).outerjoin(
+            QuestionEmbedding, QuestionEmbedding.question_id == Question.id
+        ).filter(Question.status.in_(INDEXED_STATUSES)).all()
+        active = {qid: subject for qid, subject, _ in rows}
+        stale = [qid for qid, subject in self.subject_of.items() if active.get(qid) != subject]
+        self.remove(stale)
+
+        missing = [qid for qid in active if qid not in self.subject_of]
+        # Re-encoded elsewhere after a text edit, so the indexed vector is out of date
+        edited = [
+            qid for qid, _, stored_hash in rows
+            if stored_hash is not None and qid in self.text_hash_of and self.text_hash_of[qid] != stored_hash
+        ]
+        reload_ids = missing + edited
+        for start in range(0, len(reload_ids), LOOKUP_CHUNK_SIZE):
+            chunk = reload_ids[start:start + LOOKUP_CHUNK_SIZE]
+            questions = db.query(Question).filter(Question.id.in_(chunk)).all()
+            self._add_questions(questions, store.get_vectors(questions))
+        self.last_reconciled = time.monotonic()
+
+
+# Process-wide index, built lazily on the first dedupe check
+vector_index = SubjectPartitionedIndex()
+
+
+def sync_index(db: Session, questions: List[Question]):
+    """Reflect status changes made outside the dedupe check in the in-process index"""
+    if vector_index.built and questions:
+        vector_index.sync(EmbeddingStore(db), questions)
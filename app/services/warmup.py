@@ -0,0 +1,33 @@
+import logging
+import time
+from app.core.database import SessionLocal
+from app.services.embedding_store import EmbeddingStore
+from app.services.llm_client import llm_client, reasoning_llm_client
+from app.services.vector_index import vector_index
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up() -> float:
+    """
+    Do the work normally deferred to the first request: load the embedding model,
+    build the LLM clients and the dedupe index
+
+    Returns:
+        Seconds spent warming up
+    """
+    started = time.perf_counter()
+    EmbeddingStore.get_model()
+    llm_client.load()
+    reasoning_llm_client.load()
+    vector_index.lexical.load()
+
+    db = SessionLocal()
+    try:
+        vector_index.ensure_ready(db, EmbeddingStore(db))
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Warm-up finished in {elapsed:.2f}s")
+    return elapsed
@@ -1,6 +1,9 @@
 const API_BASE_URL = '/api/v1';
 
+const PAGE_SIZE = 50;
+
 let currentStatus = null;
+let nextCursor = null;
 let selectedQuestions = new Set();
 
 // Layout Logging Utility
@@ -70,8 +73,10 @@ async function openModal(status) {
     addLog(`Opening ${titles[status]} bucket...`, 'process');
 
     try {
-        const response = await fetch(`${API_BASE_URL}/dashboard/questions/${status}`);
-        const questions = await response.json();
+        const response = await fetch(`${API_BASE_URL}/dashboard/questions/${status}?limit=${PAGE_SIZE}`);
+        const page = await response.json();
+        const questions = page.questions;
+        nextCursor = page.next_cursor;
 
         if (questions.length === 0) {
             questionList.innerHTML = '<p class="no-data">No questions in this category</p>';
@@ -80,7 +85,26 @@ async function openModal(status) {
             return;
         }
 
-        questionList.innerHTML = questions.map(q => `
+        questionList.innerHTML = questions.map(q => renderQuestionItem(q, status)).join('') + renderLoadMore();
+
+        if (status === 'DEDUPE_PENDING') {
+            modalFooter.innerHTML = `<button class="btn-action" onclick="submitForDedupe()" id="actionBtn" disabled>Submit for Deduplication Check</button>`;
+        } else if (status === 'DEDUPE_APPROVED' || status === 'DUPLICATE_FLAGGED') {
+            modalFooter.innerHTML = `<button class="btn-action" onclick="approveQuestions()" id="actionBtn" disabled>Approve Selected Questions</button>`;
+        } else {
+            modalFooter.innerHTML = '';
+        }
+
+        addLog(`Loaded ${questions.length} of ${page.total} questions from ${status}.`, 'success');
+
+    } catch (error) {
+        addLog(`Failed to load questions: ${error.message}`, 'error');
+        questionList.innerHTML = '<p class="error">Failed to load questions</p>';
+    }
+}
+
+function renderQuestionItem(q, status) {
+    return `
             <div class="question-item">
                 <input type="checkbox" class="question-checkbox" data-id="${q.id}" 
                        onchange="toggleQuestion(${q.id})">
@@ -102,21 +126,28 @@ async function openModal(status) {
                     <small class="question-id">ID: ${q.id} | Created: ${new Date(q.created_at).toLocaleString()}</small>
                 </div>
             </div>
-        `).join('');
+        `;
+}
 
-        if (status === 'DEDUPE_PENDING') {
-            modalFooter.innerHTML = `<button class="btn-action" onclick="submitForDedupe()" id="actionBtn" disabled>Submit for Deduplication Check</button>`;
-        } else if (status === 'DEDUPE_APPROVED' || status === 'DUPLICATE_FLAGGED') {
-            modalFooter.innerHTML = `<button class="btn-action" onclick="approveQuestions()" id="actionBtn" disabled>Approve Selected Questions</button>`;
-        } else {
-            modalFooter.innerHTML = '';
-        }
+function renderLoadMore() {
+    return nextCursor ? '<button class="btn-secondary" id="loadMoreBtn" onclick="loadMoreQuestions()">Load more</button>' : '';
+}
+
+// Fetch the next page of the open bucket and append it
+async function loadMoreQuestions() {
+    if (!nextCursor) return;
+    const questionList = document.getElementById('questionList');
 
-        addLog(`Loaded ${questions.length} questions from ${status}.`, 'success');
+    try {
+        const response = await fetch(`${API_BASE_URL}/dashboard/questions/${currentStatus}?limit=${PAGE_SIZE}&cursor=${encodeURIComponent(nextCursor)}`);
+        const page = await response.json();
+        nextCursor = page.next_cursor;
 
+        document.getElementById('loadMoreBtn')?.remove();
+        questionList.insertAdjacentHTML('beforeend', page.questions.map(q => renderQuestionItem(q, currentStatus)).join('') + renderLoadMore());
+        addLog(`Loaded ${page.questions.length} more questions from ${currentStatus}.`, 'success');
     } catch (error) {
-        addLog(`Failed to load questions: ${error.message}`, 'error');
-        questionList.innerHTML = '<p class="error">Failed to load questions</p>';
+        addLog(`Failed to load more questions: ${error.message}`, 'error');
     }
 }
 
@@ -326,6 +357,60 @@ window.onclick = function (event) {
     if (event.target === rModal) closeReportModal();
 }
 
+// Live updates: the server pushes dedupe progress and status changes over a WebSocket.
+// While the socket is down we fall back to polling stats every 10s.
+let statsPoller = null;
+let statsRefreshTimer = null;
+
+function scheduleStatsRefresh() {
+    // Coalesce bursts of events (e.g. per-question dedupe progress) into one fetch
+    if (statsRefreshTimer) return;
+    statsRefreshTimer = setTimeout(() => {
+        statsRefreshTimer = null;
+        loadStats();
+    }, 500);
+}
+
+function handleDashboardEvent(event) {
+    switch (event.type) {
+        case 'dedupe_started':
+            addLog(`Deduplication started for ${event.total} question(s).`, 'process');
+            break;
+        case 'dedupe_progress':
+            addLog(`Dedupe ${event.done}/${event.total}: Question #${event.question_id} → ${event.verdict}`, 'ai');
+            break;
+        case 'dedupe_finished':
+            addLog(`Deduplication finished for ${event.total} question(s).`, 'success');
+            break;
+        case 'dedupe_failed':
+            addLog(`Deduplication failed: ${event.error}`, 'error');
+            break;
+        case 'questions_created':
+            addLog(`${event.questions.length} new question(s) added.`, 'info');
+            break;
+    }
+    scheduleStatsRefresh();
+}
+
+function connectEvents(retryDelay = 1000) {
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(`${protocol}//${window.location.host}${API_BASE_URL}/dashboard/ws`);
+
+    socket.onopen = () => {
+        retryDelay = 1000;
+        if (statsPoller) {
+            clearInterval(statsPoller);
+            statsPoller = null;
+        }
+        loadStats();
+    };
+    socket.onmessage = (message) => handleDashboardEvent(JSON.parse(message.data));
+    socket.onclose = () => {
+        if (!statsPoller) statsPoller = setInterval(loadStats, 10000);
+        setTimeout(() => connectEvents(Math.min(retryDelay * 2, 30000)), retryDelay);
+    };
+}
+
 loadStats();
-setInterval(loadStats, 10000); // Auto-refresh stats every 10s to see BG progress
+connectEvents();
 addLog('Dashboard connected. Ready for operations.', 'success');
@@ -47,9 +47,23 @@ CREATE TABLE IF NOT EXISTS questions (
     INDEX idx_bloom_difficulty (bloom_level, difficulty),
     INDEX idx_parent (parent_id),
     INDEX idx_parallel (parallel_group_id),
+    INDEX ix_questions_status_created_at (status, created_at),
     FOREIGN KEY (parent_id) REFERENCES questions(id) ON DELETE SET NULL
 ) ENGINE=InnoDB;
 
+-- ---------------- QUESTION EMBEDDINGS ----------------
+
+CREATE TABLE IF NOT EXISTS question_embeddings (
+    question_id INT PRIMARY KEY,
+    model_name VARCHAR(100) NOT NULL,
+    text_hash CHAR(64) NOT NULL,
+    dim INT NOT NULL,
+    vector BLOB NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    FOREIGN KEY (question_id) REFERENCES questions(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
 -- ---------------- DUPLICATE MATCHES ----------------
 
 CREATE TABLE IF NOT EXISTS duplicate_matches (
@@ -64,11 +78,26 @@ CREATE TABLE IF NOT EXISTS duplicate_matches (
     FOREIGN KEY (match_question_id) REFERENCES questions(id) ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
+-- ---------------- PAIR VERDICTS ----------------
+
+CREATE TABLE IF NOT EXISTS pair_verdicts (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    hash_a CHAR(64) NOT NULL,
+    hash_b CHAR(64) NOT NULL,
+    model_name VARCHAR(100) NOT NULL,
+    verdict VARCHAR(50) NOT NULL,
+    reason TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    UNIQUE KEY uniq_pair_verdict (hash_a, hash_b, model_name)
+) ENGINE=InnoDB;
+
 -- ---------------- BATCH PLANS ----------------
 
 CREATE TABLE IF NOT EXISTS batch_plans (
     id INT AUTO_INCREMENT PRIMARY KEY,
     plan_name VARCHAR(255),
+    subject VARCHAR(255),
     total_questions INT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 ) ENGINE=InnoDB;
@@ -78,13 +107,22 @@ CREATE TABLE IF NOT EXISTS batch_plans (
 CREATE TABLE IF NOT EXISTS batch_questions (
     id INT AUTO_INCREMENT PRIMARY KEY,
     batch_plan_id INT NOT NULL,
-    question_id INT NOT NULL,
+    question_id INT DEFAULT NULL,
     sequence_number INT,
+    topic VARCHAR(255),
+    bloom_level ENUM('RBT1','RBT2','RBT3','RBT4','RBT5','RBT6'),
+    difficulty ENUM('EASY','MEDIUM','HARD'),
+    marks INT,
+    status ENUM('PENDING', 'RUNNING', 'COMPLETED', 'FAILED') NOT NULL DEFAULT 'PENDING',
+    error TEXT,
+    claim_token CHAR(32) DEFAULT NULL,
+    claimed_at DATETIME DEFAULT NULL,
 
     FOREIGN KEY (batch_plan_id) REFERENCES batch_plans(id) ON DELETE CASCADE,
     FOREIGN KEY (question_id) REFERENCES questions(id) ON DELETE CASCADE,
 
-    UNIQUE KEY uniq_batch_question (batch_plan_id, question_id)
+    UNIQUE KEY uniq_batch_question (batch_plan_id, question_id),
+    INDEX idx_batch_status (batch_plan_id, status)
 ) ENGINE=InnoDB;
 INSERT INTO subjects (course_code, subject_name) VALUES
 ('CS101','Data Structures'),
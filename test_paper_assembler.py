@@ -0,0 +1,125 @@
+"""
+Paper assembly on synthetic pools: relation exclusions always hold, and
+marks, Bloom mix and course outcome coverage are met when the bank allows.
+
+Run with: pytest test_paper_assembler.py
+"""
+import os
+import tempfile
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "paper_assembler.db"))
+
+import numpy as np
+from app.services.paper_assembler import (
+    QuestionPool, _VariantState, _repair_marks_by_pairs, bloom_targets, select_questions, select_variants
+)
+
+
+def make_pool(n: int, seed: int = 0) -> QuestionPool:
+    rng = np.random.default_rng(seed)
+    ids = list(range(1, n + 1))
+    return QuestionPool(
+        ids=ids,
+        marks=rng.choice([2, 5, 10], size=n).tolist(),
+        bloom=rng.integers(0, 6, size=n).tolist(),
+        difficulty=rng.integers(0, 3, size=n).tolist(),
+        # Every 4th question is the child of the one before it; runs of three share a parallel group
+        parent_ids=[qid - 1 if qid % 4 == 0 else None for qid in ids],
+        group_ids=[qid // 3 if qid % 2 else None for qid in ids],
+        links=[(qid, qid % 5 + 1) for qid in ids if qid % 7 == 0]
+    )
+
+
+def assert_no_conflicts(pool: QuestionPool, picks: list[int]):
+    assert len(set(picks)) == len(picks)
+    chosen = set(picks)
+    for i in picks:
+        assert pool.parent[i] not in chosen
+    groups = [pool.group[i] for i in picks if pool.group[i] >= 0]
+    assert len(groups) == len(set(groups))
+
+
+def test_targets_met_without_conflicts():
+    pool = make_pool(2000)
+    target = bloom_targets({"RBT1": 1, "RBT2": 1, "RBT4": 2}, 8)
+    required = np.isin(pool.co_ids, [1, 2, 3, 4, 5])
+    picks = select_questions(pool, 8, 50, target, required, np.random.default_rng(1))
+
+    assert len(picks) == 8
+    assert_no_conflicts(pool, picks)
+    assert pool.marks[picks].sum() == 50
+    assert (np.bincount(pool.bloom[picks], minlength=6) == target).all()
+    assert pool.covers[picks].any(axis=0)[required].all()
+
+
+def test_small_pool_never_breaks_exclusions():
+    # Questions 1-3 form one parallel group and 4 is the child of 3
+    pool = QuestionPool(
+        ids=[1, 2, 3, 4, 5],
+        marks=[5, 5, 5, 5, 5],
+        bloom=[0, 0, 0, 0, 0],
+        difficulty=[0, 0, 0, 0, 0],
+        parent_ids=[None, None, None, 3, None],
+        group_ids=[9, 9, 9, None, None],
+        links=[]
+    )
+    picks = select_questions(pool, 5, None, None, np.zeros(0, dtype=bool), np.random.default_rng(0))
+
+    assert len(picks) == 3
+    assert_no_conflicts(pool, picks)
+
+
+def test_variants_respect_overlap_and_hit_marks():
+    pool = make_pool(600, seed=3)
+    no_cos = np.zeros(len(pool.co_ids), dtype=bool)
+    variants = select_variants(pool, 4, 10, 60, None, no_cos, np.random.default_rng(2), max_overlap=1)
+
+    assert all(len(picks) == 10 for picks in variants)
+    for picks in variants:
+        assert_no_conflicts(pool, picks)
+        assert pool.marks[picks].sum() == 60
+    for a in range(4):
+        for b in range(a + 1, 4):
+            assert len(set(variants[a]) & set(variants[b])) <= 1
+
+
+def test_parallel_groups_fill_the_same_slot_in_every_variant():
+    # 40 groups of four interchangeable questions
+    ids = list(range(160))
+    pool = QuestionPool(
+        ids=ids,
+        marks=[5] * 160,
+        bloom=[qid % 6 for qid in ids],
+        difficulty=[qid % 3 for qid in ids],
+        parent_ids=[None] * 160,
+        group_ids=[qid // 4 for qid in ids],
+        links=[]
+    )
+    variants = select_variants(pool, 4, 6, 30, None, np.zeros(0, dtype=bool), np.random.default_rng(5), max_overlap=0)
+
+    groups = [{int(pool.group[i]) for i in picks} for picks in variants]
+    assert all(g == groups[0] for g in groups)
+    assert len({i for picks in variants for i in picks}) == 24
+
+
+def test_pair_repair_ignores_required_outcomes_already_uncovered():
+    # Only question 5 (pool position 4) covers course outcome 1 and it is never picked,
+    # so the paper misses it either way
+    pool = QuestionPool(
+        ids=[1, 2, 3, 4, 5],
+        marks=[5, 5, 7, 7, 2],
+        bloom=[0, 0, 0, 0, 0],
+        difficulty=[0, 0, 0, 0, 0],
+        parent_ids=[None] * 5,
+        group_ids=[None] * 5,
+        links=[(5, 1)]
+    )
+    state = _VariantState(pool, 1)
+    for i in (0, 1):
+        state.add(0, i)
+        state.picks[0].append(i)
+    _repair_marks_by_pairs(state, 0, 14, None, np.isin(pool.co_ids, [1]), None)
+
+    assert sorted(state.picks[0]) == [2, 3]
+    assert state.marks[0] == 14
@@ -0,0 +1,132 @@
+"""
+Guards the read paths and the question writer against N+1 queries: the
+number of SQL statements must not grow with the number of rows.
+
+Run with: pytest test_query_counts.py
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "query_counts.db"))
+
+import pytest
+from sqlalchemy import event
+from app.core.database import Base, SessionLocal, engine
+from app.models.database import BatchPlan, BatchQuestion, BatchQuestionStatus, DuplicateMatch, Question, QuestionStatus
+from app.models.subject_topic import CourseOutcome, Subject
+from app.api.dashboard import get_duplicate_matches
+from app.services.batch_service import BatchService
+from app.services.question_generator import QuestionGeneratorService
+from app.services.question_writer import QuestionWriter
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def seed(db, n: int) -> tuple[str, list[int], int]:
+    subject = Subject(course_code=f"QC{n}", subject_name=f"Query Counts {n}")
+    db.add(subject)
+    db.flush()
+    cos = [CourseOutcome(subject_id=subject.id, outcome_code=f"CO{i}", description=f"Outcome {i}") for i in range(1, 3)]
+    questions = [
+        Question(
+            subject=subject.subject_name, topic="t", bloom_level="RBT1", difficulty="EASY", marks=2,
+            question_text=f"Question {i} of {n}", status=QuestionStatus.APPROVED, course_outcomes=cos
+        )
+        for i in range(n)
+    ]
+    db.add_all(questions)
+    db.flush()
+
+    plan = BatchPlan(plan_name=f"plan {n}", subject=subject.subject_name, total_questions=n)
+    db.add(plan)
+    db.flush()
+    db.add_all([
+        BatchQuestion(batch_plan_id=plan.id, sequence_number=i, question_id=q.id, status=BatchQuestionStatus.COMPLETED)
+        for i, q in enumerate(questions, start=1)
+    ])
+    db.add_all([
+        DuplicateMatch(question_id=questions[0].id, match_question_id=q.id, similarity_score=0.9, verdict="DUPLICATE", reason="same")
+        for q in questions[1:]
+    ])
+    db.commit()
+    return subject.subject_name, [q.id for q in questions], plan.id
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.mark.parametrize("n", [3, 30])
+def test_read_paths_use_constant_queries(db, n):
+    subject, question_ids, plan_id = seed(db, n)
+    service = QuestionGeneratorService(db)
+
+    db.expunge_all()
+    with count_queries() as statements:
+        page = service.list_questions(subject=subject, limit=n)
+    assert len(page.questions) == n
+    assert all(len(q.course_outcomes) == 2 for q in page.questions)
+    assert len(statements) == 3  # count, page, course outcomes
+
+    db.expunge_all()
+    with count_queries() as statements:
+        question = service.get_question_by_id(question_ids[-1])
+    assert len(question.course_outcomes) == 2
+    assert len(statements) == 2
+
+    db.expunge_all()
+    with count_queries() as statements:
+        matches = get_duplicate_matches(question_ids[0], db=db)
+    assert len(matches) == n - 1
+    assert len(statements) == 1
+
+    db.expunge_all()
+    with count_queries() as statements:
+        batch = BatchService(db).get_batch_plan(plan_id)
+    assert len(batch.questions) == n
+    assert all(len(q.course_outcomes) == 2 for q in batch.questions)
+    assert len(statements) == 3  # plan, entries joined with questions, course outcomes
+
+
+@pytest.mark.parametrize("n", [3, 30])
+def test_question_writer_uses_constant_queries_without_returning(db, monkeypatch, n):
+    subject = Subject(course_code=f"QW{n}", subject_name=f"Question Writer {n}")
+    db.add(subject)
+    db.flush()
+    cos = [CourseOutcome(subject_id=subject.id, outcome_code=f"CO{i}", description=f"Outcome {i}") for i in range(1, 3)]
+    db.add_all(cos)
+    db.commit()
+    for co in cos:
+        db.refresh(co)
+
+    # MySQL has no INSERT ... RETURNING; force that path on SQLite
+    monkeypatch.setattr(engine.dialect, "insert_executemany_returning", False)
+    writer = QuestionWriter(db)
+    for i in range(n):
+        writer.add(f"Written question {i} of {n}", subject.subject_name, "t", "RBT1", "EASY", 2, cos)
+    with count_queries() as statements:
+        responses = writer.save(publish=False)
+    assert [r.question_text for r in responses] == [f"Written question {i} of {n}" for i in range(n)]
+    assert all(r.created_at is not None and len(r.course_outcomes) == 2 for r in responses)
+    assert len({r.id for r in responses}) == n
+    assert len(statements) == 3  # questions, read back, course outcome links
@@ -0,0 +1,173 @@
+"""
+Bulk import and streaming export through the API: failed rows are reported
+by line number, valid rows are written in chunks, the export pages by id
+and an export can be imported again.
+
+Run with: pytest test_question_import_export.py
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "import_export.db"))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.core.config import get_settings
+from app.core.database import Base, SessionLocal, engine
+from app.main import app
+from app.models.subject_topic import CourseOutcome, Subject
+import app.api.questions as questions_api
+
+FIELDS = ["subject", "topic", "bloom_level", "difficulty", "marks", "question_text", "course_outcome_ids"]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    embedded_chunks = []
+    # Record the chunks queued for embedding instead of loading the model
+    monkeypatch.setattr(questions_api, "run_bg_embed", lambda ids: embedded_chunks.append(ids))
+    test_client = TestClient(app)
+    test_client.embedded_chunks = embedded_chunks
+    return test_client
+
+
+def make_subject(code: str) -> tuple[str, list[int]]:
+    db = SessionLocal()
+    try:
+        subject = Subject(course_code=code, subject_name=f"Import Export {code}")
+        db.add(subject)
+        db.flush()
+        cos = [CourseOutcome(subject_id=subject.id, outcome_code=f"CO{i}", description=f"Outcome {i}") for i in (1, 2)]
+        db.add_all(cos)
+        db.commit()
+        return subject.subject_name, [co.id for co in cos]
+    finally:
+        db.close()
+
+
+def row(subject: str, i: int, **overrides) -> dict:
+    values = {
+        "subject": subject, "topic": "Arrays", "bloom_level": "RBT2", "difficulty": "MEDIUM",
+        "marks": 5, "question_text": f"Explain array property number {i} in detail", "course_outcome_ids": ""
+    }
+    values.update(overrides)
+    return values
+
+
+def to_csv(rows: list[dict]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def import_file(client, name: str, content: bytes) -> dict:
+    response = client.post("/api/v1/questions/import", files={"file": (name, content)})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def comparable(record: dict) -> tuple:
+    return tuple(str(record[field]) for field in FIELDS[:-1]) + (tuple(record["course_outcome_ids"]),)
+
+
+def test_import_reports_failed_lines_and_writes_in_chunks(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "IMPORT_CHUNK_SIZE", 2)
+    subject, co_ids = make_subject("IE1")
+    rows = [
+        row(subject, 1, course_outcome_ids=f"{co_ids[0]};{co_ids[1]}"),
+        row(subject, 2),
+        row(subject, 3, bloom_level="RBT9"),  # line 4
+        row(subject, 4),
+        row(subject, 5, course_outcome_ids="999999"),  # line 6
+        row(subject, 6),
+        row(subject, 7, question_text="short"),  # line 8
+    ]
+
+    report = import_file(client, "questions.csv", to_csv(rows))
+
+    assert (report["total_rows"], report["imported"], report["failed"]) == (7, 4, 3)
+    assert [error["row"] for error in report["errors"]] == [4, 6, 8]
+    assert "bloom_level" in report["errors"][0]["errors"][0]
+    assert "999999" in report["errors"][1]["errors"][0]
+    # Each chunk is written and queued for embedding on its own
+    assert [len(ids) for ids in client.embedded_chunks] == [2, 1, 1]
+
+
+def test_jsonl_import_reports_invalid_json_lines(client):
+    subject, _ = make_subject("IE2")
+    lines = [
+        json.dumps(row(subject, 1, course_outcome_ids=[])),
+        "{not json",
+        "",
+        json.dumps([1, 2]),
+        json.dumps(row(subject, 2, course_outcome_ids=[]))
+    ]
+
+    report = import_file(client, "questions.jsonl", "\n".join(lines).encode("utf-8"))
+
+    assert (report["imported"], report["failed"]) == (2, 2)
+    assert [error["row"] for error in report["errors"]] == [2, 4]
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_export_can_be_imported_again(client, fmt):
+    subject, co_ids = make_subject(f"IE3{fmt}")
+    rows = [row(subject, i, course_outcome_ids=str(co_ids[i % 2])) for i in range(5)]
+    import_file(client, "questions.csv", to_csv(rows))
+
+    exported = client.get("/api/v1/questions/export", params={"format": fmt, "subject": subject})
+    assert exported.status_code == 200
+    report = import_file(client, f"export.{fmt}", exported.content)
+    assert (report["imported"], report["failed"]) == (5, 0)
+
+    again = client.get("/api/v1/questions/export", params={"format": "jsonl", "subject": subject})
+    records = [json.loads(line) for line in again.text.splitlines()]
+    assert len(records) == 10
+    assert len({record["id"] for record in records}) == 10
+    originals = sorted(comparable(record) for record in records[:5])
+    assert sorted(comparable(record) for record in records[5:]) == originals
+
+
+def test_export_pages_by_id_without_streaming_cursors(client, monkeypatch):
+    # MySQL cannot run the course outcome query while an unbuffered cursor is open,
+    # so every page must be a complete, buffered query
+    monkeypatch.setattr(get_settings(), "EXPORT_BATCH_SIZE", 2)
+    subject, co_ids = make_subject("IE5")
+    import_file(client, "questions.csv", to_csv([row(subject, i, course_outcome_ids=str(co_ids[0])) for i in range(5)]))
+    executions = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executions.append((statement, context.execution_options.get("stream_results", False)))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        exported = client.get("/api/v1/questions/export", params={"format": "jsonl", "subject": subject})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    records = [json.loads(line) for line in exported.text.splitlines()]
+    assert [len(record["course_outcome_ids"]) for record in records] == [1] * 5
+    assert [record["id"] for record in records] == sorted(record["id"] for record in records)
+    assert not any(streaming for _, streaming in executions)
+    pages = [statement for statement, _ in executions if statement.startswith("SELECT questions.")]
+    assert len(pages) == 3 and all("LIMIT" in statement for statement in pages)
+
+
+def test_parquet_export_matches_jsonl(client):
+    pq = pytest.importorskip("pyarrow.parquet")
+    subject, co_ids = make_subject("IE4")
+    import_file(client, "questions.csv", to_csv([row(subject, i, course_outcome_ids=str(co_ids[0])) for i in range(3)]))
+
+    parquet = client.get("/api/v1/questions/export", params={"format": "parquet", "subject": subject})
+    jsonl = client.get("/api/v1/questions/export", params={"format": "jsonl", "subject": subject})
+
+    assert parquet.status_code == 200
+    assert pq.read_table(io.BytesIO(parquet.content)).to_pylist() == [json.loads(line) for line in jsonl.text.splitlines()]